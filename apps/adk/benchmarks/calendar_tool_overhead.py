@@ -0,0 +1,139 @@
+"""比較每次 calendar tool 呼叫的 client 成本
+
+執行方式（於 apps/adk 目錄）:
+    uv run python -m benchmarks.calendar_tool_overhead --iterations 500
+    # 連到本機替身，包含真實的連線建立成本
+    uv run python -m benchmarks.fake_calendar --port 8090 &
+    uv run python -m benchmarks.calendar_tool_overhead --url http://127.0.0.1:8090/calendar/v3/
+
+before: 舊流程，每次呼叫都以 googleapiclient 的 build() 解析 discovery document，
+        並透過新的 httplib2 連線送出請求
+after:  process 內共用的 httpx CalendarClient（連線池、keep-alive、HTTP/2）
+
+未指定 --url 時，兩者的回應皆由 mock 提供，只量測 client 端的 CPU 成本。
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMock, build_http
+
+from src.services.calendar_client import CalendarClient
+
+EVENTS_RESPONSE = json.dumps(
+    {
+        "kind": "calendar#events",
+        "items": [
+            {
+                "id": f"event{i}",
+                "summary": f"Event {i}",
+                "start": {"dateTime": "2025-01-01T09:00:00+08:00"},
+                "end": {"dateTime": "2025-01-01T10:00:00+08:00"},
+            }
+            for i in range(10)
+        ],
+    }
+).encode()
+
+LIST_PARAMS = dict(
+    timeMin="2025-01-01T00:00:00Z",
+    maxResults=10,
+    singleEvents=True,
+    orderBy="startTime",
+)
+
+
+def before_call(url: str | None) -> dict:
+    """舊流程：每次呼叫 build()，並建立新的 http 連線"""
+    if url:
+        http = build_http()
+    else:
+        http = HttpMock(headers={"status": "200"})
+        http.data = EVENTS_RESPONSE
+    service = build(
+        "calendar",
+        "v3",
+        http=AuthorizedHttp(Credentials(token="benchmark-token"), http=http),
+        client_options={"api_endpoint": url or "https://www.googleapis.com/calendar/v3/"},
+    )
+    return service.events().list(calendarId="primary", **LIST_PARAMS).execute()
+
+
+def make_client(url: str | None) -> CalendarClient:
+    transport = None
+    if not url:
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=EVENTS_RESPONSE)
+        )
+    return CalendarClient(
+        base_url=url or "https://www.googleapis.com/calendar/v3/",
+        timeout=10,
+        connect_timeout=5,
+        max_connections=10,
+        max_keepalive_connections=10,
+        keepalive_expiry=60,
+        transport=transport,
+    )
+
+
+def summarize(durations: list[float]) -> dict:
+    durations.sort()
+    return {
+        "mean_us": statistics.mean(durations) * 1e6,
+        "p50_us": durations[len(durations) // 2] * 1e6,
+        "p99_us": durations[int(len(durations) * 0.99) - 1] * 1e6,
+    }
+
+
+def measure_before(url: str | None, iterations: int) -> dict:
+    before_call(url)  # 暖身
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        before_call(url)
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+async def measure_after(url: str | None, iterations: int) -> dict:
+    client = make_client(url)
+    try:
+        await client.list_events("benchmark-token", **LIST_PARAMS)  # 暖身（建立連線）
+        durations = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await client.list_events("benchmark-token", **LIST_PARAMS)
+            durations.append(time.perf_counter() - start)
+    finally:
+        await client.aclose()
+    return summarize(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--url", help="Calendar API base URL（例如本機替身），未指定則使用 mock")
+    args = parser.parse_args()
+
+    before = measure_before(args.url, args.iterations)
+    after = asyncio.run(measure_after(args.url, args.iterations))
+
+    print(f"{'':8}{'mean (us)':>12}{'p50 (us)':>12}{'p99 (us)':>12}")
+    for label, result in (("before", before), ("after", after)):
+        print(
+            f"{label:8}{result['mean_us']:>12.1f}{result['p50_us']:>12.1f}"
+            f"{result['p99_us']:>12.1f}"
+        )
+    print(f"speedup: {before['mean_us'] / max(after['mean_us'], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""本機 Google Calendar v3 替身：實作 calendar tools 用到的 events API 子集
+
+支援 events list（分頁、timeMin/timeMax、syncToken）/ get / insert / update / patch / delete
+與 multipart batch endpoint，並可注入延遲與錯誤率。每個 access token 各自擁有一份資料，另提供假的 OAuth token endpoint。
+
+執行方式（於 apps/adk 目錄）:
+    uv run python -m benchmarks.fake_calendar --port 8090 --latency-ms 80 --error-rate 0.01
+
+讓 app 與 tools 指向它:
+    GOOGLE_CALENDAR_API_URL=http://127.0.0.1:8090/calendar/v3/
+    GOOGLE_OAUTH_TOKEN_URL=http://127.0.0.1:8090/token
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+MAX_PAGE_SIZE = 2500
+DEFAULT_PAGE_SIZE = 250
+
+
+def _error(code: int, message: str, reason: str) -> JSONResponse:
+    """Google API 格式的錯誤回應"""
+    return JSONResponse(
+        status_code=code,
+        content={
+            "error": {
+                "code": code,
+                "message": message,
+                "errors": [{"domain": "global", "reason": reason, "message": message}],
+            }
+        },
+    )
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _event_time(value: dict) -> datetime:
+    if "dateTime" in value:
+        return _parse_time(value["dateTime"])
+    return datetime.fromisoformat(value["date"]).replace(tzinfo=timezone.utc)
+
+
+def _encode_token(payload: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _decode_token(token: str) -> dict:
+    return json.loads(base64.urlsafe_b64decode(token.encode()))
+
+
+@dataclass
+class Calendar:
+    """單一日曆；每次變更遞增 version，sync token 即為 version"""
+    events: dict[str, dict] = field(default_factory=dict)
+    versions: dict[str, int] = field(default_factory=dict)
+    version: int = 0
+
+    def touch(self, event: dict) -> dict:
+        self.version += 1
+        event["etag"] = f'"{self.version}"'
+        event["updated"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        self.events[event["id"]] = event
+        self.versions[event["id"]] = self.version
+        return event
+
+
+class FakeCalendarBackend:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed_events: int = 0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed_events = seed_events
+        self.random = random.Random(seed)
+        # (access token, calendar id) -> Calendar
+        self.calendars: dict[tuple[str, str], Calendar] = {}
+        self.requests = 0
+
+    def calendar(self, token: str, calendar_id: str) -> Calendar:
+        key = (token, calendar_id)
+        calendar = self.calendars.get(key)
+        if calendar is None:
+            calendar = self.calendars[key] = Calendar()
+            self._seed(calendar)
+        return calendar
+
+    def _seed(self, calendar: Calendar) -> None:
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        for i in range(self.seed_events):
+            begins = start + timedelta(hours=i * 3)
+            calendar.touch(
+                self.new_event(
+                    {
+                        "summary": f"Seed event {i}",
+                        "start": {"dateTime": begins.isoformat()},
+                        "end": {"dateTime": (begins + timedelta(hours=1)).isoformat()},
+                    }
+                )
+            )
+
+    @staticmethod
+    def new_event(body: dict) -> dict:
+        event_id = uuid.uuid4().hex
+        return {
+            **body,
+            "kind": "calendar#event",
+            "id": event_id,
+            "status": body.get("status", "confirmed"),
+            "htmlLink": f"https://calendar.google.com/event?eid={event_id}",
+            "created": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        }
+
+    async def inject(self) -> Optional[Response]:
+        """模擬網路延遲與隨機錯誤"""
+        self.requests += 1
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            if self.random.random() < 0.5:
+                return _error(429, "Rate Limit Exceeded", "rateLimitExceeded")
+            return _error(503, "Backend Error", "backendError")
+        return None
+
+    def list_events(self, calendar: Calendar, params: dict[str, str]) -> Any:
+        page_size = min(int(params.get("maxResults", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        page_token = params.get("pageToken")
+        sync_token = params.get("syncToken")
+
+        if page_token:
+            state = _decode_token(page_token)
+            offset, snapshot, since = state["offset"], state["snapshot"], state["since"]
+        else:
+            offset, snapshot, since = 0, calendar.version, None
+            if sync_token:
+                if any(params.get(k) for k in ("timeMin", "timeMax", "orderBy")):
+                    return _error(400, "syncToken cannot be combined with filters", "invalid")
+                try:
+                    since = int(sync_token)
+                except ValueError:
+                    since = -1
+                if not 0 <= since <= calendar.version:
+                    return _error(410, "Sync token is no longer valid", "fullSyncRequired")
+
+        if since is not None:
+            # 增量同步：回傳 since 之後變更的事件（含已刪除）
+            items = [
+                event
+                for event_id, event in calendar.events.items()
+                if since < calendar.versions[event_id] <= snapshot
+            ]
+        else:
+            time_min = _parse_time(params.get("timeMin"))
+            time_max = _parse_time(params.get("timeMax"))
+            show_deleted = params.get("showDeleted") == "true"
+            items = [
+                event
+                for event in calendar.events.values()
+                if (show_deleted or event["status"] != "cancelled")
+                and (time_min is None or _event_time(event["end"]) > time_min)
+                and (time_max is None or _event_time(event["start"]) < time_max)
+            ]
+            if params.get("orderBy") == "startTime":
+                items.sort(key=lambda event: _event_time(event["start"]))
+
+        page = items[offset:offset + page_size]
+        body: dict[str, Any] = {
+            "kind": "calendar#events",
+            "items": page,
+        }
+        if offset + page_size < len(items):
+            body["nextPageToken"] = _encode_token(
+                {"offset": offset + page_size, "snapshot": snapshot, "since": since}
+            )
+        else:
+            body["nextSyncToken"] = str(snapshot)
+        return body
+
+
+def _token(request: Request) -> Optional[str]:
+    auth = request.headers.get("authorization", "")
+    return auth[7:] if auth.lower().startswith("bearer ") else None
+
+
+def create_app(backend: FakeCalendarBackend) -> FastAPI:
+    app = FastAPI(title="Fake Google Calendar")
+    prefix = "/calendar/v3/calendars/{calendar_id}/events"
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path.startswith("/calendar/"):
+            if not _token(request):
+                return _error(401, "Request is missing required authentication credential.", "required")
+            injected = await backend.inject()
+            if injected is not None:
+                return injected
+        return await call_next(request)
+
+    def lookup(request: Request, calendar_id: str, event_id: str):
+        calendar = backend.calendar(_token(request), calendar_id)
+        event = calendar.events.get(event_id)
+        if event is None:
+            return calendar, None, _error(404, "Not Found", "notFound")
+        return calendar, event, None
+
+    def precondition(request: Request, event: dict) -> Optional[JSONResponse]:
+        if_match = request.headers.get("if-match")
+        if if_match and if_match != "*" and if_match != event["etag"]:
+            return _error(412, "Precondition Failed", "conditionNotMet")
+        return None
+
+    @app.get(prefix)
+    async def list_events(calendar_id: str, request: Request):
+        calendar = backend.calendar(_token(request), calendar_id)
+        return backend.list_events(calendar, dict(request.query_params))
+
+    @app.post(prefix)
+    async def insert_event(calendar_id: str, request: Request):
+        calendar = backend.calendar(_token(request), calendar_id)
+        return calendar.touch(backend.new_event(await request.json()))
+
+    @app.get(prefix + "/{event_id}")
+    async def get_event(calendar_id: str, event_id: str, request: Request):
+        _, event, error = lookup(request, calendar_id, event_id)
+        if error is not None:
+            return error
+        if request.headers.get("if-none-match") == event["etag"]:
+            return Response(status_code=304)
+        return event
+
+    @app.put(prefix + "/{event_id}")
+    async def update_event(calendar_id: str, event_id: str, request: Request):
+        calendar, event, error = lookup(request, calendar_id, event_id)
+        if error is None:
+            error = precondition(request, event)
+        if error is not None:
+            return error
+        body = await request.json()
+        keep = {k: event[k] for k in ("kind", "id", "htmlLink", "created")}
+        return calendar.touch({"status": "confirmed", **body, **keep})
+
+    @app.patch(prefix + "/{event_id}")
+    async def patch_event(calendar_id: str, event_id: str, request: Request):
+        calendar, event, error = lookup(request, calendar_id, event_id)
+        if error is None:
+            error = precondition(request, event)
+        if error is not None:
+            return error
+        return calendar.touch({**event, **await request.json(), "id": event_id})
+
+    @app.delete(prefix + "/{event_id}")
+    async def delete_event(calendar_id: str, event_id: str, request: Request):
+        calendar, event, error = lookup(request, calendar_id, event_id)
+        if error is not None:
+            return error
+        if event["status"] == "cancelled":
+            return _error(410, "Resource has been deleted", "deleted")
+        error = precondition(request, event)
+        if error is not None:
+            return error
+        calendar.touch({**event, "status": "cancelled"})
+        return Response(status_code=204)
+
+    @app.post("/batch/calendar/v3")
+    async def batch(request: Request):
+        """multipart/mixed batch：逐一轉送子請求給上面的 handlers（每個子請求各自計入延遲與錯誤）"""
+        boundary = request.headers.get("content-type", "").partition("boundary=")[2].strip('"')
+        if not boundary:
+            return _error(400, "Missing multipart boundary", "invalid")
+        authorization = request.headers.get("authorization", "")
+        content = (await request.body()).replace(b"\r\n", b"\n")
+        parts = [
+            part.strip(b"\n")
+            for part in content.split(b"--" + boundary.encode())[1:]
+            if not part.startswith(b"--")
+        ]
+        if len(parts) > 50:
+            return _error(400, "Too many requests in batch", "invalid")
+
+        async def forward(part: bytes) -> bytes:
+            part_headers, _, http_request = part.partition(b"\n\n")
+            content_id = ""
+            for line in part_headers.decode().split("\n"):
+                key, _, value = line.partition(":")
+                if key.strip().lower() == "content-id":
+                    content_id = value.strip().strip("<>")
+            head, _, body = http_request.partition(b"\n\n")
+            method, path, _ = head.split(b"\n", 1)[0].decode().split(" ", 2)
+            sub = await subclient.request(
+                method, path, content=body or None,
+                headers={"authorization": authorization, "content-type": "application/json"},
+            )
+            return (
+                f"Content-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {sub.status_code} {sub.reason_phrase}\r\n"
+                f"Content-Type: application/json\r\n\r\n"
+            ).encode() + sub.content
+
+        responses = await asyncio.gather(*(forward(part) for part in parts))
+        reply = f"batch_{uuid.uuid4().hex}"
+        payload = b"".join(f"--{reply}\r\n".encode() + r + b"\r\n" for r in responses)
+        return Response(
+            content=payload + f"--{reply}--\r\n".encode(),
+            media_type=f"multipart/mixed; boundary={reply}",
+        )
+
+    subclient = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fake")
+
+    @app.post("/token")
+    async def token():
+        """假的 OAuth token endpoint（authorization_code 與 refresh_token 皆直接核發）"""
+        return {
+            "access_token": f"fake-{uuid.uuid4().hex}",
+            "refresh_token": f"fake-refresh-{uuid.uuid4().hex}",
+            "expires_in": 3600,
+            "token_type": "Bearer",
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "requests": backend.requests,
+            "calendars": len(backend.calendars),
+            "events": sum(len(c.events) for c in backend.calendars.values()),
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每個請求的固定延遲")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="額外的隨機延遲上限")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回傳 429 / 503 的機率")
+    parser.add_argument("--seed-events", type=int, default=50, help="每個日曆預先建立的事件數")
+    parser.add_argument("--seed", type=int, default=0, help="隨機數種子")
+    args = parser.parse_args()
+
+    backend = FakeCalendarBackend(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        seed_events=args.seed_events,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(backend), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
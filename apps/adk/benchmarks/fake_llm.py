@@ -0,0 +1,107 @@
+"""本機 fake LLM：可重現的輸出、可設定的 token 速率、延遲與 tool call 腳本
+
+用於 benchmark，不呼叫 Gemini、不消耗 quota。
+
+    from benchmarks.fake_llm import FakeLlm, install_fake_models
+    install_fake_models(root_agent, FakeLlm(tokens_per_second=200, response_tokens=120))
+"""
+import asyncio
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+
+class FakeLlm(BaseLlm):
+    """依腳本回應的 LLM
+
+    每一輪先依序送出 tool_calls 中的 function call（每收到一個 function response 前進一步），
+    腳本走完後回覆 response_tokens 個 token 的固定文字。
+    """
+
+    model: str = "fake-llm"
+    # 回覆的 token 數與產生速率（token/s，0 表示不等待）
+    response_tokens: int = 50
+    tokens_per_second: float = 0.0
+    # 每次呼叫的固定延遲（模擬網路與 prefill）
+    first_token_latency: float = 0.0
+    # [(tool 名稱, 參數)]
+    tool_calls: list[tuple[str, dict]] = []
+    # streaming 模式下每個 partial response 的 token 數
+    chunk_tokens: int = 5
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"fake-llm.*"]
+
+    def _pending_tool_call(self, llm_request: LlmRequest) -> tuple[str, dict] | None:
+        """本輪（最後一則使用者輸入之後）已完成的 function response 數決定下一步"""
+        responses = 0
+        for content in reversed(llm_request.contents):
+            parts = content.parts or []
+            if any(part.function_response for part in parts):
+                responses += 1
+            elif content.role == "user":
+                break
+        if responses < len(self.tool_calls):
+            return self.tool_calls[responses]
+        return None
+
+    def _tokens(self, start: int, count: int) -> str:
+        return "".join(f"tok{i} " for i in range(start, start + count))
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.first_token_latency:
+            await asyncio.sleep(self.first_token_latency)
+
+        tool_call = self._pending_tool_call(llm_request)
+        if tool_call is not None:
+            name, args = tool_call
+            yield LlmResponse(
+                content=types.Content(
+                    role="model",
+                    parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))],
+                )
+            )
+            return
+
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+        if not stream:
+            if delay:
+                await asyncio.sleep(delay * self.response_tokens)
+            yield LlmResponse(
+                content=types.Content(
+                    role="model", parts=[types.Part(text=self._tokens(0, self.response_tokens))]
+                )
+            )
+            return
+
+        emitted = 0
+        while emitted < self.response_tokens:
+            count = min(self.chunk_tokens, self.response_tokens - emitted)
+            if delay:
+                await asyncio.sleep(delay * count)
+            yield LlmResponse(
+                content=types.Content(
+                    role="model", parts=[types.Part(text=self._tokens(emitted, count))]
+                ),
+                partial=True,
+            )
+            emitted += count
+        yield LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text=self._tokens(0, self.response_tokens))]
+            ),
+            partial=False,
+        )
+
+
+def install_fake_models(agent: BaseAgent, llm: FakeLlm, **overrides: FakeLlm) -> None:
+    """將 agent tree 的 model 換成 fake LLM；overrides 以 agent 名稱指定不同的設定"""
+    if isinstance(agent, LlmAgent):
+        agent.model = overrides.get(agent.name, llm)
+    for sub_agent in agent.sub_agents:
+        install_fake_models(sub_agent, llm, **overrides)
@@ -0,0 +1,247 @@
+"""/api/chat 端對端壓測：真實的 FastAPI app + uvicorn，model 換成本機 fake LLM
+
+執行方式（於 apps/adk 目錄）:
+    uv run python -m benchmarks.load_test --clients 50 --requests 500
+    uv run python -m benchmarks.load_test --scenario tool --tokens-per-second 400
+    uv run python -m benchmarks.load_test --json bench.json --max-p99-ttft-ms 250
+
+server 在獨立 thread 的 event loop 中執行，client 在主執行緒；
+event-loop lag 於 server 的 loop 量測（排程 sleep 的實際延遲）。
+指定 --max-* 門檻時，超過即以非 0 結束，可用於 CI 偵測效能退化。
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+# 必須在 import app 之前設定：不使用資料庫、不限制單一來源的請求頻率
+os.environ.setdefault("GOOGLE_GENERATIVE_AI_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("SESSION_BACKEND", "memory")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("CHAT_USER_RATE_PER_SECOND", "1000000")
+os.environ.setdefault("CHAT_USER_BURST", "1000000")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from benchmarks.fake_llm import FakeLlm, install_fake_models  # noqa: E402
+from src.agents.root_agent import root_agent  # noqa: E402
+from src.api.main import app  # noqa: E402
+from src.constants import CALENDAR_AGENT_NAME  # noqa: E402
+
+SCENARIOS = ("chat", "tool", "transfer")
+
+
+def configure_models(args) -> None:
+    """依情境設定 fake LLM：純文字、先呼叫 tool、或轉交 calendar agent"""
+    base = dict(
+        response_tokens=args.response_tokens,
+        tokens_per_second=args.tokens_per_second,
+        first_token_latency=args.latency_ms / 1000,
+    )
+    root_calls: list[tuple[str, dict]] = []
+    if args.scenario == "tool":
+        root_calls = [("get_current_time", {})]
+    elif args.scenario == "transfer":
+        root_calls = [("transfer_to_agent", {"agent_name": CALENDAR_AGENT_NAME})]
+
+    install_fake_models(
+        root_agent,
+        FakeLlm(**base),
+        **{
+            root_agent.name: FakeLlm(**base, tool_calls=root_calls),
+            CALENDAR_AGENT_NAME: FakeLlm(**base, tool_calls=[("get_current_time", {})]),
+        },
+    )
+
+
+class ServerThread:
+    """在背景 thread 執行 uvicorn，並量測該 loop 的 event-loop lag"""
+
+    def __init__(self, port: int, lag_interval: float):
+        self.port = port
+        self.lag_interval = lag_interval
+        self.lags: list[float] = []
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", loop="asyncio")
+        )
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self._sampling = False
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._serve())
+
+    async def _serve(self) -> None:
+        lag_task = asyncio.create_task(self._sample_lag())
+        try:
+            await self.server.serve()
+        finally:
+            lag_task.cancel()
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            if self._sampling:
+                self.lags.append(max(loop.time() - expected, 0.0))
+
+    def start(self) -> None:
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+
+    def sampling(self, enabled: bool) -> None:
+        self._sampling = enabled
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_one(client: httpx.AsyncClient, index: int) -> dict:
+    """送出一個 chat 請求並讀完 SSE 串流"""
+    body = {"messages": [{"role": "user", "content": f"load test message {index}"}]}
+    started = time.perf_counter()
+    first_token = None
+    tokens = 0
+    error = None
+    async with client.stream("POST", "/api/chat", json=body) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            frame = json.loads(line[6:])
+            if frame["type"] == "text-delta":
+                if first_token is None:
+                    first_token = time.perf_counter()
+                tokens += frame["delta"].count("tok")
+            elif frame["type"] == "error":
+                error = frame.get("code") or frame.get("error")
+    finished = time.perf_counter()
+    return {
+        "ttft": (first_token or finished) - started,
+        "latency": finished - started,
+        "tokens": tokens,
+        "error": error,
+    }
+
+
+async def drive(base_url: str, clients: int, total: int) -> tuple[list[dict], float]:
+    """以 clients 個並行連線送出 total 個請求"""
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    results: list[dict] = []
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+
+        async def worker() -> None:
+            for index in counter:
+                results.append(await run_one(client, index))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def summarize(results: list[dict], elapsed: float, lags: list[float]) -> dict:
+    ok = [r for r in results if r["error"] is None]
+    ttft = [r["ttft"] for r in ok]
+    latency = [r["latency"] for r in ok]
+    tokens = sum(r["tokens"] for r in ok)
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "elapsed_s": elapsed,
+        "requests_per_s": len(ok) / elapsed if elapsed else 0.0,
+        "tokens_per_s": tokens / elapsed if elapsed else 0.0,
+        "ttft_p50_ms": percentile(ttft, 0.50) * 1000,
+        "ttft_p99_ms": percentile(ttft, 0.99) * 1000,
+        "latency_p50_ms": percentile(latency, 0.50) * 1000,
+        "latency_p99_ms": percentile(latency, 0.99) * 1000,
+        "latency_mean_ms": statistics.mean(latency) * 1000 if latency else 0.0,
+        "loop_lag_p50_ms": percentile(lags, 0.50) * 1000,
+        "loop_lag_p99_ms": percentile(lags, 0.99) * 1000,
+        "loop_lag_max_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="並行 SSE client 數")
+    parser.add_argument("--requests", type=int, default=200, help="總請求數")
+    parser.add_argument("--warmup", type=int, default=10, help="不列入統計的暖身請求數")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="chat")
+    parser.add_argument("--response-tokens", type=int, default=100)
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="每次 LLM 呼叫的固定延遲")
+    parser.add_argument("--lag-interval-ms", type=float, default=10.0)
+    parser.add_argument("--json", help="將結果寫入 JSON 檔")
+    parser.add_argument("--max-p99-ttft-ms", type=float)
+    parser.add_argument("--max-p99-latency-ms", type=float)
+    parser.add_argument("--max-loop-lag-ms", type=float)
+    args = parser.parse_args()
+
+    configure_models(args)
+    server = ServerThread(free_port(), args.lag_interval_ms / 1000)
+    server.start()
+    base_url = f"http://127.0.0.1:{server.port}"
+    try:
+        if args.warmup:
+            asyncio.run(drive(base_url, min(args.clients, args.warmup), args.warmup))
+        server.sampling(True)
+        results, elapsed = asyncio.run(drive(base_url, args.clients, args.requests))
+        server.sampling(False)
+    finally:
+        server.stop()
+
+    summary = summarize(results, elapsed, server.lags)
+    summary.update(scenario=args.scenario, clients=args.clients)
+    for key, value in summary.items():
+        print(f"{key:18}{value:>14.2f}" if isinstance(value, float) else f"{key:18}{value:>14}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    failures = [
+        f"{name} {summary[key]:.1f} > {limit}"
+        for name, key, limit in (
+            ("p99 TTFT (ms)", "ttft_p99_ms", args.max_p99_ttft_ms),
+            ("p99 latency (ms)", "latency_p99_ms", args.max_p99_latency_ms),
+            ("max loop lag (ms)", "loop_lag_max_ms", args.max_loop_lag_ms),
+        )
+        if limit is not None and summary[key] > limit
+    ]
+    if summary["errors"]:
+        failures.append(f"{summary['errors']} requests failed")
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
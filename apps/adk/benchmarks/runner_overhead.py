@@ -0,0 +1,100 @@
+"""比較每個 chat 請求的 Runner / model client 建立成本
+
+執行方式（於 apps/adk 目錄）:
+    uv run python -m benchmarks.runner_overhead --iterations 200
+
+before: 舊流程，每個請求建立新的 Runner，且每次 LLM 呼叫都由字串解析出新的 model client
+after:  app 啟動時建立一次 Runner 並預熱 agent tree，請求只取用全局實例
+"""
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+
+# model client 建立需要 API key，benchmark 不會真的呼叫 Gemini
+os.environ.setdefault("GOOGLE_GENERATIVE_AI_API_KEY", "benchmark-dummy-key")
+
+from google.adk import Runner  # noqa: E402
+from google.adk.models.registry import LLMRegistry  # noqa: E402
+
+from src.agents.root_agent import root_agent  # noqa: E402
+from src.constants import APP_NAME, ROOT_AGENT_MODEL, SUB_AGENT_MODEL  # noqa: E402
+from src.services.runner_service import get_runner, init_runner  # noqa: E402
+from src.services.session_service import get_session_service  # noqa: E402
+
+# 一個經過 transfer 的 calendar 請求大約會呼叫 root 與 sub agent 的 model 各一次
+MODELS_PER_REQUEST = [ROOT_AGENT_MODEL, SUB_AGENT_MODEL]
+
+
+def before_request() -> None:
+    """舊流程：每個請求建立 Runner，並由字串建立 model client"""
+    Runner(
+        app_name=APP_NAME,
+        agent=root_agent,
+        session_service=get_session_service(),
+    )
+    for model_name in MODELS_PER_REQUEST:
+        LLMRegistry.new_llm(model_name).api_client
+
+
+def after_request() -> None:
+    """新流程：取用全局 Runner 與已預熱的 model client"""
+    runner = get_runner()
+    runner.agent.canonical_model.api_client
+    for sub_agent in runner.agent.sub_agents:
+        sub_agent.canonical_model.api_client
+
+
+def measure(fn, iterations: int) -> dict:
+    """量測每次呼叫的耗時與殘留記憶體"""
+    fn()  # 暖身，排除 import 與第一次初始化成本
+
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    for _ in range(iterations):
+        fn()
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(
+        stat.size_diff
+        for stat in snapshot_after.compare_to(snapshot_before, "filename")
+        if stat.size_diff > 0
+    )
+
+    durations.sort()
+    return {
+        "mean_us": statistics.mean(durations) * 1e6,
+        "p50_us": durations[len(durations) // 2] * 1e6,
+        "p99_us": durations[int(len(durations) * 0.99) - 1] * 1e6,
+        "retained_bytes_per_req": retained / iterations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # before 必須在預熱之前量測，預熱後 agent.model 會被替換為實例
+    before = measure(before_request, args.iterations)
+    init_runner()
+    after = measure(after_request, args.iterations)
+
+    print(f"{'':8}{'mean (us)':>12}{'p50 (us)':>12}{'p99 (us)':>12}{'retained/req (B)':>16}")
+    for label, result in (("before", before), ("after", after)):
+        print(
+            f"{label:8}{result['mean_us']:>12.1f}{result['p50_us']:>12.1f}"
+            f"{result['p99_us']:>12.1f}{result['retained_bytes_per_req']:>16.0f}"
+        )
+    print(f"speedup: {before['mean_us'] / max(after['mean_us'], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
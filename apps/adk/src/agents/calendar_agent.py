@@ -3,7 +3,6 @@ from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
 from google.adk.tools.base_tool import BaseTool
 from google.adk.tools.tool_context import ToolContext
-from sqlalchemy.orm import Session
 
 from ..constants import CALENDAR_AGENT_NAME, SUB_AGENT_MODEL, PROMPTS_DIR
 from ..tools.calendar_tools import (
@@ -11,15 +10,21 @@ from ..tools.calendar_tools import (
     create_calendar_event,
     update_calendar_event,
     delete_calendar_event,
+    batch_calendar_operations,
+    need_auth_result,
 )
+from ..tools.concurrency import user_limited_tool
 from ..tools.datetime_tools import (
     get_current_time,
     calculate_relative_time,
     get_time_range,
 )
-from ..db.session import get_db
+from ..db.session import AsyncSessionLocal
 from ..services.token_service import TokenService
+from ..services.metrics import CALENDAR_TOKEN_LOOKUP_SECONDS
 from ..config import settings
+from .compaction import CompactionPolicy, make_compaction_callback
+from .user_context import with_user_context
 
 
 def load_instruction(filename: str) -> str:
@@ -31,38 +36,41 @@ def load_instruction(filename: str) -> str:
 async def before_calendar_tool(
     tool: BaseTool, args: dict, tool_context: ToolContext
 ) -> dict | None:
-    """在呼叫 calendar tool 前自動注入 access_token"""
+    """在呼叫 calendar tool 前自動注入 access_token
+
+    回傳 None 表示照常執行 tool；回傳 dict 時 ADK 會略過 tool，直接以該 dict 作為結果。
+    """
     # 只對需要 access_token 的工具注入（calendar 相關工具）
     tool_name = tool.name if hasattr(tool, 'name') else str(tool)
 
     # 時間工具不需要 access_token
     if any(keyword in tool_name for keyword in ['time', 'datetime', 'get_current', 'calculate', 'get_time_range']):
-        return args
+        return None
 
     # 從 context 取得 user_id
     user_id = tool_context.user_id
 
     # 從資料庫取得 access_token
-    db = next(get_db())
     try:
-        token_service = TokenService(db)
-        access_token = await token_service.get_valid_token(
-            user_id=user_id,
-            provider="google_calendar"
-        )
-
-        # 將 access_token 注入到 args 中
-        args["access_token"] = access_token
-        print(f"[DEBUG] Injected access_token for user {user_id}")
-
-        return args
+        with CALENDAR_TOKEN_LOOKUP_SECONDS.time():
+            async with AsyncSessionLocal() as db:
+                token_service = TokenService(db)
+                access_token = await token_service.get_valid_token(
+                    user_id=user_id,
+                    provider="google_calendar"
+                )
     except Exception as e:
         print(f"[DEBUG] Failed to get access_token: {e}")
-        # 提供預設的空 token，讓 tool 可以執行但會失敗
-        args["access_token"] = ""
-        return args
-    finally:
-        db.close()
+        access_token = None
+
+    if not access_token:
+        # 尚未授權或 token 已失效且無法刷新：不執行 tool，直接回傳授權連結
+        return need_auth_result(user_id)
+
+    # 將 access_token 注入到 args 中
+    args["access_token"] = access_token
+    print(f"[DEBUG] Injected access_token for user {user_id}")
+    return None
 
 
 async def on_calendar_tool_error(
@@ -74,13 +82,7 @@ async def on_calendar_tool_error(
     # 檢查是否為授權問題
     error_str = str(error)
     if "credentials" in error_str.lower() or "unauthorized" in error_str.lower() or not args.get("access_token"):
-        return {
-            "success": False,
-            "error": "您尚未授權 Google Calendar 存取權限",
-            "need_auth": True,
-            "user_id": user_id,
-            "auth_url": f"{settings.backend_url}/auth/google/calendar?user_id={user_id}"
-        }
+        return need_auth_result(user_id)
 
     # 其他錯誤
     return {
@@ -94,18 +96,27 @@ calendar_agent = LlmAgent(
     name=CALENDAR_AGENT_NAME,
     model=SUB_AGENT_MODEL,
     description="行事曆管理 Agent，處理 Google Calendar 操作",
-    instruction=load_instruction("calendar_agent.md"),
+    instruction=with_user_context(load_instruction("calendar_agent.md")),
     tools=[
         # 時間工具
         FunctionTool(get_current_time),
         FunctionTool(calculate_relative_time),
         FunctionTool(get_time_range),
-        # Calendar 工具
-        FunctionTool(list_calendar_events),
-        FunctionTool(create_calendar_event),
-        FunctionTool(update_calendar_event),
-        FunctionTool(delete_calendar_event),
+        # Calendar 工具（async，多個 function call 可並行，每位使用者有並行上限）
+        FunctionTool(user_limited_tool(list_calendar_events)),
+        FunctionTool(user_limited_tool(create_calendar_event)),
+        FunctionTool(user_limited_tool(update_calendar_event)),
+        FunctionTool(user_limited_tool(delete_calendar_event)),
+        FunctionTool(user_limited_tool(batch_calendar_operations)),
     ],
+    before_model_callback=make_compaction_callback(
+        CALENDAR_AGENT_NAME,
+        CompactionPolicy(
+            max_tokens=settings.calendar_history_max_tokens,
+            max_contents=settings.calendar_history_max_contents,
+            keep_recent=settings.calendar_history_keep_recent,
+        ),
+    ),
     before_tool_callback=before_calendar_tool,
     on_tool_error_callback=on_calendar_tool_error,
 )
@@ -0,0 +1,176 @@
+"""對話歷史壓縮：歷史超過門檻時，以摘要取代較舊的輪次，只保留最近幾輪原文
+
+ADK 每次呼叫 LLM 都會從 session events 重建完整的 contents，
+這裡在 before_model_callback 中改寫 llm_request.contents。
+摘要存在 session state，之後的輪次直接沿用，直到再次超過門檻才重新摘要。
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+
+from google import genai
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from ..constants import SUMMARY_MODEL
+from ..services.metrics import (
+    HISTORY_COMPACTIONS,
+    PROMPT_CONTENTS,
+    PROMPT_TOKENS_ESTIMATE,
+)
+
+SUMMARY_PREFIX = "[先前對話摘要]"
+# 摘要失敗時，每則舊訊息保留的字數
+_FALLBACK_CHARS = 200
+
+_client: Optional[genai.Client] = None
+
+
+@dataclass(frozen=True)
+class CompactionPolicy:
+    """max_tokens / max_contents 任一超過即壓縮，保留最近 keep_recent 則 contents 原文"""
+    max_tokens: int
+    max_contents: int
+    keep_recent: int
+
+
+def estimate_tokens(contents: list[types.Content]) -> int:
+    """粗估 token 數（UTF-8 位元組 / 4），只用於門檻判斷與指標"""
+    size = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                size += len(part.text.encode("utf-8"))
+            elif part.function_call:
+                size += len(str(part.function_call.args or {}).encode("utf-8"))
+            elif part.function_response:
+                size += len(str(part.function_response.response or {}).encode("utf-8"))
+    return size // 4
+
+
+def _is_turn_start(content: types.Content) -> bool:
+    """使用者輸入的文字訊息（不是 function response），可作為保留區段的開頭"""
+    return content.role == "user" and not any(
+        part.function_response for part in content.parts or []
+    )
+
+
+def _find_cut(contents: list[types.Content], keep_recent: int) -> int:
+    """往前找到使用者輸入的位置切分，避免拆開 function call 與 response"""
+    cut = max(len(contents) - max(keep_recent, 1), 0)
+    while cut > 0 and not _is_turn_start(contents[cut]):
+        cut -= 1
+    return cut
+
+
+def _digest(contents: list[types.Content]) -> str:
+    digest = hashlib.sha256()
+    for content in contents:
+        digest.update((content.role or "").encode("utf-8"))
+        for part in content.parts or []:
+            if part.text:
+                digest.update(part.text.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _transcript(contents: list[types.Content]) -> str:
+    lines = []
+    for content in contents:
+        speaker = "使用者" if content.role == "user" else "助理"
+        for part in content.parts or []:
+            if part.text:
+                lines.append(f"{speaker}：{part.text}")
+            elif part.function_call:
+                lines.append(f"助理呼叫 {part.function_call.name}({part.function_call.args})")
+            elif part.function_response:
+                lines.append(f"{part.function_response.name} 回傳：{part.function_response.response}")
+    return "\n".join(lines)
+
+
+def _fallback_summary(previous: str, contents: list[types.Content]) -> str:
+    lines = [previous] if previous else []
+    for content in contents:
+        speaker = "使用者" if content.role == "user" else "助理"
+        for part in content.parts or []:
+            if part.text:
+                lines.append(f"{speaker}：{part.text[:_FALLBACK_CHARS]}")
+    return "\n".join(lines)
+
+
+async def summarize(previous: str, contents: list[types.Content]) -> str:
+    """將先前摘要與新移出的輪次合併成新的摘要"""
+    global _client
+    prompt = (
+        "請將以下對話整理成簡潔的摘要，保留使用者的需求、已確認的事實、"
+        "提到的日期時間與行程資訊，以及尚未完成的事項。只輸出摘要內容。\n\n"
+    )
+    if previous:
+        prompt += f"先前的摘要：\n{previous}\n\n"
+    prompt += f"對話：\n{_transcript(contents)}"
+    try:
+        if _client is None:
+            _client = genai.Client()
+        response = await _client.aio.models.generate_content(
+            model=SUMMARY_MODEL, contents=prompt
+        )
+        if response.text:
+            return response.text.strip()
+    except Exception as e:
+        print(f"[DEBUG] History summary failed: {e}")
+    return _fallback_summary(previous, contents)
+
+
+def make_compaction_callback(agent_name: str, policy: CompactionPolicy):
+    """建立指定 agent 的 before_model_callback"""
+    state_key = f"compaction_{agent_name}"
+
+    async def compact_history(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        contents = llm_request.contents
+        tokens_before = estimate_tokens(contents)
+        PROMPT_TOKENS_ESTIMATE.observe(tokens_before, agent=agent_name, stage="before")
+        PROMPT_CONTENTS.observe(len(contents), agent=agent_name, stage="before")
+
+        # 上次壓縮的結果：前 upto 則 contents 已由 summary 取代
+        saved = callback_context.state.get(state_key) or {}
+        upto = saved.get("upto", 0)
+        summary = saved.get("summary", "")
+        if upto >= len(contents) or (upto and saved.get("digest") != _digest(contents[:upto])):
+            # 歷史已不同（例如 session 被重建），捨棄舊摘要
+            upto, summary = 0, ""
+
+        remaining = contents[upto:]
+        if (
+            estimate_tokens(remaining) > policy.max_tokens
+            or len(remaining) > policy.max_contents
+        ):
+            cut = upto + _find_cut(remaining, policy.keep_recent)
+            if cut > upto:
+                summary = await summarize(summary, contents[upto:cut])
+                upto = cut
+                callback_context.state[state_key] = {
+                    "upto": upto,
+                    "digest": _digest(contents[:upto]),
+                    "summary": summary,
+                }
+                HISTORY_COMPACTIONS.inc(agent=agent_name)
+                print(f"[DEBUG] Compacted {upto} contents for {agent_name}")
+
+        if upto:
+            # 摘要併入保留區段的第一則使用者訊息，維持 user / model 交替
+            first = contents[upto]
+            merged = types.Content(
+                role=first.role,
+                parts=[types.Part(text=f"{SUMMARY_PREFIX}\n{summary}"), *(first.parts or [])],
+            )
+            llm_request.contents = [merged, *contents[upto + 1:]]
+
+        PROMPT_TOKENS_ESTIMATE.observe(
+            estimate_tokens(llm_request.contents), agent=agent_name, stage="after"
+        )
+        PROMPT_CONTENTS.observe(len(llm_request.contents), agent=agent_name, stage="after")
+        return None
+
+    return compact_history
@@ -6,6 +6,8 @@ from google.adk.tools import FunctionTool
 from ..constants import ROOT_AGENT_NAME, ROOT_AGENT_MODEL, PROMPTS_DIR
 from ..config import settings
 from .calendar_agent import calendar_agent
+from .compaction import CompactionPolicy, make_compaction_callback
+from .user_context import with_user_context
 from ..tools.datetime_tools import get_current_time, calculate_relative_time
 
 
@@ -23,10 +25,18 @@ root_agent = LlmAgent(
     name=ROOT_AGENT_NAME,
     model=ROOT_AGENT_MODEL,
     description="主要助理，負責協調任務分配",
-    instruction=load_instruction("root_agent.md"),
+    instruction=with_user_context(load_instruction("root_agent.md")),
     tools=[
         FunctionTool(get_current_time),
         FunctionTool(calculate_relative_time),
     ],
     sub_agents=[calendar_agent],
+    before_model_callback=make_compaction_callback(
+        ROOT_AGENT_NAME,
+        CompactionPolicy(
+            max_tokens=settings.root_history_max_tokens,
+            max_contents=settings.root_history_max_contents,
+            keep_recent=settings.root_history_keep_recent,
+        ),
+    ),
 )
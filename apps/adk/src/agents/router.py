@@ -0,0 +1,83 @@
+"""本機意圖分類：明確的行事曆請求直接交給 calendar_agent，省去 root_agent 的 LLM 轉交
+
+只依關鍵字判斷，無法確定時回傳 None，沿用 root_agent 的原有流程。
+"""
+import re
+from typing import Optional
+
+from ..constants import CALENDAR_AGENT_NAME
+from ..services.metrics import (
+    CHAT_ROOT_HOP_SECONDS,
+    CHAT_ROUTE_DECISIONS,
+    CHAT_ROUTER_SAVED_SECONDS,
+)
+
+# root_agent 轉交一次的平均耗時（EWMA），作為 fast path 每次省下的時間估計
+_EWMA_ALPHA = 0.1
+_root_hop_estimate = 0.0
+
+# 單獨出現即可判定為行事曆請求
+_CALENDAR_NOUNS = re.compile(r"行事曆|日曆|calendar|google\s*cal", re.IGNORECASE)
+
+# 使用者自己的行程名詞（不含「活動」「event」「schedule」這類也常指公開資訊的字）
+_EVENT_NOUNS = re.compile(
+    r"行程|會議|開會|約會|排程|預約|meeting|appointment",
+    re.IGNORECASE,
+)
+# 寫入操作：行程名詞 + 寫入動詞即可判定
+_WRITE_ACTIONS = re.compile(
+    r"新增|加入|加到|建立|安排|排入|預約|刪除|刪掉|取消|修改|更改|改到|改成|移到|延後|提前|"
+    r"\b(?:add|create|book|schedule|delete|remove|cancel|move|reschedule|update)\b",
+    re.IGNORECASE,
+)
+# 查詢用語較泛用，需另有時間線索才判定
+_QUERY_ACTIONS = re.compile(
+    r"查詢|查看|查一下|看一下|看看|列出|有哪些|有什麼|有沒有|幾點|"
+    r"\b(?:list|show|what|any)\b",
+    re.IGNORECASE,
+)
+_TIME_CUES = re.compile(
+    r"今天|明天|後天|今晚|早上|上午|中午|下午|晚上|接下來|最近|這週|本週|下週|這禮拜|下禮拜|"
+    r"週[一二三四五六日末]|星期[一二三四五六日天]|禮拜[一二三四五六日天]|\d+\s*[月號日點]|"
+    r"\b(?:today|tomorrow|tonight|upcoming|this week|next week|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b|\d{1,2}(?::\d{2})?\s*[ap]m\b",
+    re.IGNORECASE,
+)
+
+# 同時出現這些內容時意圖不明確（可能是一般問題或多重任務），交給 root_agent 判斷
+_AMBIGUOUS = re.compile(
+    r"天氣|新聞|翻譯|寫一|是什麼|為什麼|怎麼用|教我|\bweather\b|\btranslate\b|\bwhy\b|\bhow to\b",
+    re.IGNORECASE,
+)
+
+
+def route_message(text: str) -> Optional[str]:
+    """回傳應直接處理此訊息的 agent 名稱；不確定時回傳 None"""
+    if not text or _AMBIGUOUS.search(text):
+        return None
+    if _CALENDAR_NOUNS.search(text):
+        return CALENDAR_AGENT_NAME
+    if not _EVENT_NOUNS.search(text):
+        return None
+    if _WRITE_ACTIONS.search(text):
+        return CALENDAR_AGENT_NAME
+    if _QUERY_ACTIONS.search(text) and _TIME_CUES.search(text):
+        return CALENDAR_AGENT_NAME
+    return None
+
+
+def observe_root_hop(seconds: float) -> None:
+    """記錄經由 root_agent 轉交到 calendar_agent 所花的時間"""
+    global _root_hop_estimate
+    CHAT_ROOT_HOP_SECONDS.observe(seconds)
+    if _root_hop_estimate:
+        _root_hop_estimate += _EWMA_ALPHA * (seconds - _root_hop_estimate)
+    else:
+        _root_hop_estimate = seconds
+
+
+def record_route(route: Optional[str]) -> None:
+    """記錄路由結果；走 fast path 時累加估計省下的時間"""
+    CHAT_ROUTE_DECISIONS.inc(route=route or "root")
+    if route is not None:
+        CHAT_ROUTER_SAVED_SECONDS.inc(_root_hop_estimate)
@@ -0,0 +1,23 @@
+"""登入用戶資訊放在 user state（user: 前綴），由 instruction 帶給 model，不寫入對話歷史
+
+對話歷史因此不含個人資料，回覆快取與歷史壓縮都不必特別處理注入的文字。
+"""
+from typing import Callable
+
+from google.adk.agents.readonly_context import ReadonlyContext
+
+USER_NAME_KEY = "user:name"
+USER_EMAIL_KEY = "user:email"
+
+
+def with_user_context(instruction: str) -> Callable[[ReadonlyContext], str]:
+    """回傳 InstructionProvider：有登入用戶資訊時附加在 instruction 之後"""
+
+    def provider(context: ReadonlyContext) -> str:
+        name = context.state.get(USER_NAME_KEY)
+        email = context.state.get(USER_EMAIL_KEY)
+        if not name and not email:
+            return instruction
+        return f"{instruction}\n\n[系統資訊] 當前用戶：{name or email}（{email or ''}）"
+
+    return provider
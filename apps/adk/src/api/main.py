@@ -1,13 +1,45 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from .routes import chat_router, oauth_router, conversations_router, users_router
+from .routes import (
+    attachments_router,
+    chat_router,
+    conversations_router,
+    oauth_router,
+    users_router,
+)
 from ..config import settings
+from ..db.session import engine
+from ..services.calendar_client import close_calendar_client
+from ..services.runner_service import init_runner, close_runner
+from ..services.message_writer import get_message_writer
+from ..services.metrics import REGISTRY
+from ..services.session_service import get_session_service
+from ..services.stream_store import get_stream_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """App 生命週期：啟動時建立 Runner，關閉時釋放資源"""
+    init_runner()
+    get_message_writer().start()
+    yield
+    # 先等進行中的串流結束，它們送出的訊息才會被 writer 寫入
+    await get_stream_store().shutdown(timeout=10)
+    await get_message_writer().stop()
+    await close_runner()
+    await close_calendar_client()
+    await engine.dispose()
+
 
 app = FastAPI(
     title="AI Assistant API",
     description="AI 助理後端 API，使用 Google ADK",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS 設定
@@ -27,6 +59,7 @@ app.include_router(chat_router)
 app.include_router(oauth_router)
 app.include_router(conversations_router)
 app.include_router(users_router)
+app.include_router(attachments_router)
 
 
 @app.get("/")
@@ -37,3 +70,35 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+
+def _db_pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("overflow",): pool.overflow(),
+    }
+
+
+def _session_store_stats() -> dict:
+    stats = getattr(get_session_service(), "stats", dict)()
+    return {(kind,): value for kind, value in stats.items()}
+
+
+REGISTRY.gauge(
+    "db_pool_connections", "Database connection pool usage", ["state"],
+    callback=_db_pool_stats,
+)
+REGISTRY.gauge(
+    "session_store_items", "Sessions, events and bytes held by the session store", ["kind"],
+    callback=_session_store_stats,
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 格式指標"""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -2,5 +2,12 @@ from .chat import router as chat_router
 from .oauth import router as oauth_router
 from .conversations import router as conversations_router
 from .users import router as users_router
+from .attachments import router as attachments_router
 
-__all__ = ["chat_router", "oauth_router", "conversations_router", "users_router"]
+__all__ = [
+    "chat_router",
+    "oauth_router",
+    "conversations_router",
+    "users_router",
+    "attachments_router",
+]
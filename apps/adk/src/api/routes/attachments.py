@@ -0,0 +1,117 @@
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...config import settings
+from ...db.models import Attachment, User
+from ...db.session import get_db
+from ...services.blob_store import BlobTooLarge, InvalidBlobId, get_blob_store
+
+
+router = APIRouter(prefix="/api/attachments", tags=["attachments"])
+
+# 只接受圖片與文件；其他類型（例如 text/html、image/svg+xml）可能被瀏覽器當成頁面執行
+ALLOWED_MEDIA_TYPES = frozenset(
+    {
+        "image/png",
+        "image/jpeg",
+        "image/gif",
+        "image/webp",
+        "application/pdf",
+        "text/plain",
+        "text/csv",
+        "text/markdown",
+    }
+)
+
+# 所有回應都禁止瀏覽器猜測內容類型
+_NOSNIFF = {"X-Content-Type-Options": "nosniff"}
+
+
+def _error(status_code: int, detail: str) -> HTTPException:
+    return HTTPException(status_code=status_code, detail=detail, headers=_NOSNIFF)
+
+
+async def _lookup_user(db: AsyncSession, user_id: str) -> User | None:
+    """以 UUID 或 google_id 查詢用戶"""
+    try:
+        user_uuid = uuid.UUID(user_id)
+        result = await db.execute(select(User).where(User.id == user_uuid))
+    except ValueError:
+        result = await db.execute(select(User).where(User.google_id == user_id))
+    return result.scalars().first()
+
+
+@router.post("")
+async def upload_attachment(
+    request: Request,
+    response: Response,
+    user_id: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """串流上傳附件（request body 為檔案原始內容），回傳 blobId 供訊息引用
+
+    media type 取自上傳時的 Content-Type，必須在允許清單內；每位使用者的附件總量有上限。
+    """
+    user = await _lookup_user(db, user_id)
+    if user is None:
+        raise _error(401, "User not found")
+
+    content_type = request.headers.get("content-type", "")
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type not in ALLOWED_MEDIA_TYPES:
+        raise _error(415, f"Unsupported media type: {media_type or 'unknown'}")
+
+    used = await db.scalar(
+        select(func.coalesce(func.sum(Attachment.size), 0)).where(
+            Attachment.user_id == user.id
+        )
+    )
+    remaining = settings.attachment_user_quota_bytes - used
+    if remaining <= 0:
+        raise _error(413, "Attachment quota exceeded")
+
+    try:
+        info = await get_blob_store().save(
+            request.stream(), max_bytes=min(settings.attachment_max_bytes, remaining)
+        )
+    except BlobTooLarge as e:
+        raise _error(413, str(e))
+
+    # 同一使用者重複上傳相同內容時沿用第一次的紀錄，不重複計入用量
+    await db.execute(
+        insert(Attachment)
+        .values(user_id=user.id, blob_id=info.blob_id, media_type=media_type, size=info.size)
+        .on_conflict_do_nothing(index_elements=["user_id", "blob_id"])
+    )
+    await db.commit()
+
+    print(f"[DEBUG] Stored attachment {info.blob_id} ({info.size} bytes)")
+    response.headers.update(_NOSNIFF)
+    return {"blobId": info.blob_id, "size": info.size, "mediaType": media_type}
+
+
+@router.get("/{blob_id}")
+async def get_attachment(blob_id: str, db: AsyncSession = Depends(get_db)):
+    """讀取附件（以 sendfile 傳送，內容不變所以可長期快取）
+
+    只以上傳時記錄的 media type 回應；非圖片一律以下載方式提供。
+    """
+    try:
+        path = get_blob_store().path(blob_id)
+    except InvalidBlobId:
+        raise _error(400, "Invalid blob id")
+
+    media_type = await db.scalar(
+        select(Attachment.media_type).where(Attachment.blob_id == blob_id).limit(1)
+    )
+    if media_type not in ALLOWED_MEDIA_TYPES or not path.is_file():
+        raise _error(404, "Attachment not found")
+
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", **_NOSNIFF}
+    if not media_type.startswith("image/"):
+        headers["Content-Disposition"] = "attachment"
+    return FileResponse(path, media_type=media_type, headers=headers)
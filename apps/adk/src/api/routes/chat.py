@@ -1,20 +1,53 @@
+import asyncio
+import base64
 import json
+import time
 import uuid
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from sse_starlette.sse import EventSourceResponse
 
-from google.adk import Runner
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService
 from google.genai import types
 
-from ...db.session import get_db
+from ...db.session import AsyncSessionLocal
 from ...db.models import User
-from ...agents.root_agent import root_agent
+from ...config import settings
+from ...agents.router import observe_root_hop, record_route, route_message
+from ...agents.user_context import USER_EMAIL_KEY, USER_NAME_KEY
+from ...constants import APP_NAME, CALENDAR_AGENT_NAME, ROOT_AGENT_NAME
 from ...services.token_service import TokenService
 from ...services.session_service import get_session_service
+from ...services.runner_service import get_runner
+from ...services.message_writer import get_message_writer
+from ...services.run_registry import get_run_registry
+from ...services.admission import AdmissionRejected, get_admission_controller
+from ...services.answer_cache import get_answer_cache
+from ...services.blob_store import BlobTooLarge, get_blob_store
+from ...services.stream_store import StreamRecord, get_stream_store
+from ...services.metrics import (
+    CHAT_EVENTS_PER_TURN,
+    CHAT_IDEMPOTENT_REPLAYS,
+    CHAT_RUNS_CANCELLED,
+    CHAT_SESSION_SECONDS,
+    CHAT_STREAM_RESUMES,
+    CHAT_STREAM_SECONDS,
+    CHAT_STREAMS_IN_FLIGHT,
+    CHAT_TTFT_SECONDS,
+    CHAT_USER_LOOKUP_SECONDS,
+)
+from ..sse import (
+    FINISH_FRAME,
+    HEARTBEAT_FRAME,
+    DeltaStream,
+    SSEWriter,
+    error_frame,
+)
 
 
 router = APIRouter(prefix="/api", tags=["chat"])
@@ -25,6 +58,9 @@ class MessagePart(BaseModel):
     text: Optional[str] = None
     data: Optional[str] = None
     mediaType: Optional[str] = None
+    # 透過 /api/attachments 上傳後取得的 blob id，取代 data 內嵌的 base64
+    blobId: Optional[str] = None
+    filename: Optional[str] = None
 
 
 class Message(BaseModel):
@@ -37,30 +73,93 @@ class ChatRequest(BaseModel):
     messages: List[Message]
     user_id: Optional[str] = None
     conversation_id: Optional[str] = None
+    # 重送同一個請求時帶相同的 key，會附加到原本的串流或重播結果，不會重新執行 agent
+    idempotency_key: Optional[str] = None
 
 
 @router.post("/chat")
-async def chat(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+):
     """SSE streaming chat endpoint"""
     print(f"[DEBUG] Received request: user_id={request.user_id}, messages count={len(request.messages)}")
     if request.messages:
         print(f"[DEBUG] Last message: {request.messages[-1]}")
 
+    # 匿名請求以來源位址計算頻率
+    client_host = http_request.client.host if http_request.client else "unknown"
+    admission_key = request.user_id or f"ip:{client_host}"
+
+    # 相同 idempotency key 的請求共用同一份串流紀錄，重送時附加或重播，不重新執行 agent
+    store = get_stream_store()
+    idempotency_alias = (
+        f"{admission_key}:{request.idempotency_key}" if request.idempotency_key else None
+    )
+    if idempotency_alias:
+        record = store.get_by_alias(idempotency_alias)
+        if record is not None and not record.failed:
+            print(f"[DEBUG] Idempotent replay for {idempotency_alias} (done={record.done})")
+            CHAT_IDEMPOTENT_REPLAYS.inc(state="replay" if record.done else "attach")
+            return _follow_response(record, http_request, start=_resume_start(record, http_request))
+
+    # 生成唯一的 message ID
+    message_id = str(uuid.uuid4())
+
+    # 回覆快取：登入用戶的 instruction 含有用戶資訊，key 以用戶區隔；
+    # 附件內容不在 key 中，不使用快取
+    answer_cache = get_answer_cache()
+    cache_key = None
+    if (
+        answer_cache is not None
+        and request.messages
+        and not any(part.type != "text" for part in request.messages[-1].parts or [])
+    ):
+        cache_key = answer_cache.make_key(
+            [(message.role, message.content) for message in request.messages[:-1]],
+            request.messages[-1].content,
+            scope=request.user_id or "",
+        )
+
+    # 本機意圖分類，省去 root_agent 轉交的 LLM 來回
+    route = (
+        route_message(request.messages[-1].content)
+        if settings.chat_fast_path_enabled and request.messages
+        else None
+    )
+    route_label = route or "root"
+
     async def generate():
+        started_at = time.perf_counter()
+        CHAT_STREAMS_IN_FLIGHT.inc()
+        admission = get_admission_controller()
+        admitted = False
         try:
             print("[DEBUG] Starting generate()")
 
+            # 快取命中不執行 agent，也不佔用執行名額
+            cached_answer = answer_cache.get(cache_key) if cache_key else None
+            if cached_answer is not None:
+                print(f"[DEBUG] Answer cache hit for {message_id}")
+            else:
+                # 准入控制：超出並行上限時排隊；超過使用者頻率、佇列已滿或等待逾時則立即回傳錯誤
+                try:
+                    await admission.acquire(admission_key)
+                    admitted = True
+                except AdmissionRejected as e:
+                    print(f"[DEBUG] Admission rejected ({e.reason}) for {admission_key}")
+                    yield error_frame(
+                        "伺服器忙碌中，請稍後再試",
+                        code=e.reason,
+                        retryAfter=round(e.retry_after, 1),
+                    )
+                    return
+
             # 查詢用戶資訊
             user = None
             if request.user_id:
-                try:
-                    # 嘗試將 user_id 轉換為 UUID
-                    import uuid as uuid_lib
-                    user_uuid = uuid_lib.UUID(request.user_id)
-                    user = db.query(User).filter(User.id == user_uuid).first()
-                except ValueError:
-                    # 如果不是 UUID 格式，可能是 google_id
-                    user = db.query(User).filter(User.google_id == request.user_id).first()
+                with CHAT_USER_LOOKUP_SECONDS.time():
+                    user = await _lookup_user(request.user_id)
 
                 if user:
                     print(f"[DEBUG] Found user: {user.name} ({user.email})")
@@ -70,119 +169,316 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
             # 使用全局 session service，避免每次創建新的
             session_service = get_session_service()
 
-            # 建立 Runner (API key 已在 root_agent.py 中設定為環境變數)
-            runner = Runner(
-                app_name="agents",
-                agent=root_agent,
-                session_service=session_service,
-            )
-            print("[DEBUG] Runner created")
+            # 使用 app 啟動時建立的全局 Runner；明確的行事曆請求直接從 calendar_agent 開始
+            runner = get_runner(route)
+            record_route(route)
+            run_registry = get_run_registry()
 
             # 使用 conversation_id 作為 session_id，確保同一個對話共用同一個 session
-            user_id = request.user_id or "anonymous"
             session_id = request.conversation_id or str(uuid.uuid4())
+            # 匿名使用者以對話區分，避免所有匿名對話共用同一個 user bucket
+            user_id = request.user_id or f"anonymous:{session_id}"
             print(f"[DEBUG] Using session_id={session_id} (from conversation_id)")
 
-            # 判斷是否為新對話（第一則訊息）
-            is_new_conversation = len(request.messages) == 1
-
             # 檢查 session 是否已存在
             try:
-                existing_session = await session_service.get_session(
-                    app_name="agents",
-                    user_id=user_id,
-                    session_id=session_id,
-                )
+                with CHAT_SESSION_SECONDS.time(operation="get"):
+                    existing_session = await session_service.get_session(
+                        app_name=APP_NAME,
+                        user_id=user_id,
+                        session_id=session_id,
+                    )
                 print(f"[DEBUG] Existing session found: {existing_session is not None}")
             except:
                 existing_session = None
                 print("[DEBUG] No existing session, will create new one")
 
-            # 如果是新 session，創建並注入用戶資訊
+            # 如果是新 session，創建並把用戶資訊寫入 user state（由 instruction 帶給 model）
+            session = existing_session
             if not existing_session:
-                session = await session_service.create_session(
-                    app_name="agents",
-                    user_id=user_id,
-                    session_id=session_id,
+                user_state = (
+                    {USER_NAME_KEY: user.name, USER_EMAIL_KEY: user.email} if user else None
                 )
+                with CHAT_SESSION_SECONDS.time(operation="create"):
+                    session = await session_service.create_session(
+                        app_name=APP_NAME,
+                        user_id=user_id,
+                        session_id=session_id,
+                        state=user_state,
+                    )
                 print(f"[DEBUG] New session created: {session}")
 
             # 取得最後一則訊息（當前用戶輸入）
             last_message = request.messages[-1] if request.messages else None
             if not last_message:
-                yield 'data: {"type":"error","error":"No message provided"}\n\n'
+                yield error_frame("No message provided")
                 return
 
             # 建立當前訊息內容
             user_text = last_message.content
 
-            # 如果是新對話且有用戶資訊，注入用戶資訊
-            if is_new_conversation and user:
-                user_text = f"[系統資訊] 當前用戶：{user.name}（{user.email}）\n\n{user_text}"
-                print(f"[DEBUG] Injected user context for {user.name}")
+            # 附件：內嵌的 base64 先存入 blob store，訊息只保存引用
+            try:
+                file_parts, attachments = await _attachment_parts(last_message.parts or [])
+            except (ValueError, FileNotFoundError, BlobTooLarge) as e:
+                yield error_frame(f"附件無法讀取：{e}")
+                return
+
+            # 使用者訊息交給背景批次寫入，不等待資料庫
+            message_writer = get_message_writer()
+            owner_id = user.id if user else None
+            message_writer.submit(
+                request.conversation_id,
+                owner_id,
+                "user",
+                last_message.content,
+                attachments=json.dumps(attachments) if attachments else None,
+            )
 
             content = types.Content(
                 role="user",
-                parts=[types.Part(text=user_text)],
+                parts=[types.Part(text=user_text), *file_parts],
             )
             print(f"[DEBUG] Content created")
 
-            # 生成唯一的 message ID
-            message_id = str(uuid.uuid4())
+            writer = SSEWriter(message_id)
 
-            # 發送 start event
-            yield f'data: {json.dumps({"type":"start","messageId":message_id})}\n\n'
+            # 發送 start / text-start event
+            yield writer.start()
+            yield writer.text_start()
 
-            # 發送 text-start event
-            yield f'data: {json.dumps({"type":"text-start","id":message_id})}\n\n'
+            if cached_answer is not None:
+                # 仍寫入 ADK session，後續對話才有完整脈絡
+                await _append_cached_turn(session_service, session, content, cached_answer)
+                CHAT_TTFT_SECONDS.observe(time.perf_counter() - started_at, route=route_label)
+                message_writer.submit(
+                    request.conversation_id, owner_id, "assistant", cached_answer
+                )
+                yield writer.text_delta(cached_answer)
+                yield writer.text_end()
+                yield writer.finish()
+                return
 
             print(f"[DEBUG] Running agent with user_id={user_id}, session_id={session_id}")
 
-            full_response = ""
+            response_parts: list[str] = []
             event_count = 0
-            current_agent = None
-            async for event in runner.run_async(
-                user_id=user_id,
-                session_id=session_id,
-                new_message=content,
-            ):
-                event_count += 1
-
-                # 追蹤 agent 切換
-                event_agent = getattr(event, 'agent_name', None) or getattr(event, 'agent', None)
-                if event_agent and event_agent != current_agent:
-                    current_agent = event_agent
-                    agent_name = current_agent.name if hasattr(current_agent, 'name') else str(current_agent)
-                    print(f"[DEBUG] 🔄 Agent switched to: {agent_name}")
-
-                # 顯示 event 類型和 agent
-                agent_info = f" (agent: {current_agent.name if hasattr(current_agent, 'name') else current_agent})" if current_agent else ""
-                print(f"[DEBUG] Event #{event_count}: {type(event).__name__}{agent_info}")
-
-                if event.content and event.content.parts:
-                    for part in event.content.parts:
-                        if part.text:
-                            full_response += part.text
-                            print(f"[DEBUG] Yielding text: {part.text[:50]}...")
-                            # SSE data stream protocol 格式
-                            yield f'data: {json.dumps({"type":"text-delta","id":message_id,"delta":part.text})}\n\n'
+            used_tools = False
+
+            async def agent_texts():
+                """迭代 agent events，輸出文字片段"""
+                nonlocal event_count, used_tools
+                current_agent = None
+                run_started_at = time.perf_counter()
+                # 經由 root_agent 轉交到 calendar_agent 時，記錄到轉交為止的耗時（fast path 省下的時間）；
+                # 不含 calendar_agent 自己的 LLM 呼叫，那段 fast path 同樣要付
+                hop_recorded = False
+                async for event in runner.run_async(
+                    user_id=user_id,
+                    session_id=session_id,
+                    new_message=content,
+                ):
+                    event_count += 1
+                    if event.get_function_calls():
+                        # 呼叫過 tool（含轉交 sub-agent）的回覆依賴外部狀態，不快取
+                        used_tools = True
+                    if (
+                        not hop_recorded
+                        and event.author == ROOT_AGENT_NAME
+                        and event.actions
+                        and event.actions.transfer_to_agent == CALENDAR_AGENT_NAME
+                    ):
+                        observe_root_hop(time.perf_counter() - run_started_at)
+                        hop_recorded = True
+
+                    # 追蹤 agent 切換
+                    event_agent = getattr(event, 'agent_name', None) or getattr(event, 'agent', None)
+                    if event_agent and event_agent != current_agent:
+                        current_agent = event_agent
+                        agent_name = current_agent.name if hasattr(current_agent, 'name') else str(current_agent)
+                        print(f"[DEBUG] 🔄 Agent switched to: {agent_name}")
+
+                    # 顯示 event 類型和 agent
+                    agent_info = f" (agent: {current_agent.name if hasattr(current_agent, 'name') else current_agent})" if current_agent else ""
+                    print(f"[DEBUG] Event #{event_count}: {type(event).__name__}{agent_info}")
+
+                    if event.content and event.content.parts:
+                        for part in event.content.parts:
+                            if part.text:
+                                response_parts.append(part.text)
+                                yield part.text
+
+            # 合併時間窗內的文字片段，減少小 frame 與 syscall
+            stream = DeltaStream(
+                agent_texts(),
+                window_seconds=settings.sse_coalesce_window_ms / 1000,
+                max_bytes=settings.sse_coalesce_max_bytes,
+            )
+            run_registry.register(message_id, request.user_id, stream.cancel)
 
+            first_token_at = None
+            try:
+                async for delta in stream:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        CHAT_TTFT_SECONDS.observe(first_token_at - started_at, route=route_label)
+                    yield writer.text_delta(delta)
+            except (asyncio.CancelledError, GeneratorExit):
+                # 所有 client 斷線超過 grace period，紀錄的背景 task 被取消
+                if not stream.cancelled:
+                    CHAT_RUNS_CANCELLED.inc(reason="disconnect")
+                stream.cancel()
+                raise
+            finally:
+                run_registry.unregister(message_id)
+
+            if stream.cancelled:
+                print(f"[DEBUG] Run {message_id} cancelled")
+                CHAT_RUNS_CANCELLED.inc(reason="request")
+
+            full_response = "".join(response_parts)
             print(f"[DEBUG] Total events: {event_count}, Full response length: {len(full_response)}")
+            CHAT_EVENTS_PER_TURN.observe(event_count)
 
-            # 發送 text-end event
-            yield f'data: {json.dumps({"type":"text-end","id":message_id})}\n\n'
+            if full_response:
+                message_writer.submit(
+                    request.conversation_id, owner_id, "assistant", full_response
+                )
+                if cache_key and not stream.cancelled and not used_tools:
+                    answer_cache.put(cache_key, full_response)
 
-            # 發送 finish event
-            yield f'data: {json.dumps({"type":"finish","finishReason":"stop"})}\n\n'
+            # 發送 text-end / finish event
+            yield writer.text_end()
+            yield writer.finish()
 
         except Exception as e:
             print(f"[DEBUG] Error: {e}")
             import traceback
             traceback.print_exc()
-            yield f'data: {json.dumps({"type":"error","error":str(e)})}\n\n'
+            yield error_frame(str(e))
+        finally:
+            if admitted:
+                admission.release()
+            CHAT_STREAMS_IN_FLIGHT.dec()
+            CHAT_STREAM_SECONDS.observe(time.perf_counter() - started_at)
+
+    # agent run 在背景寫入串流紀錄；client 斷線後可帶 Last-Event-ID 從中斷處續傳
+    record = store.create(message_id, owner=request.user_id, alias=idempotency_alias)
+    record.run(generate(), finish_frame=FINISH_FRAME)
+    return _follow_response(record, http_request)
+
+
+async def _append_cached_turn(
+    session_service: BaseSessionService,
+    session: Session,
+    content: types.Content,
+    answer: str,
+) -> None:
+    """將快取命中的這一輪（使用者輸入與回覆）寫入 ADK session"""
+    invocation_id = f"e-{uuid.uuid4()}"
+    await session_service.append_event(
+        session, Event(invocation_id=invocation_id, author="user", content=content)
+    )
+    await session_service.append_event(
+        session,
+        Event(
+            invocation_id=invocation_id,
+            author=ROOT_AGENT_NAME,
+            content=types.Content(role="model", parts=[types.Part(text=answer)]),
+        ),
+    )
+
+
+async def _attachment_parts(
+    parts: List[MessagePart],
+) -> tuple[list[types.Part], list[dict]]:
+    """將 file part 轉為送給 model 的 types.Part，並回傳要保存的附件引用"""
+    blob_store = get_blob_store()
+    file_parts: list[types.Part] = []
+    attachments: list[dict] = []
+    for part in parts:
+        if part.type != "file":
+            continue
+        blob_id = part.blobId
+        if not blob_id and part.data:
+            # 相容舊版 client：data 可能是 data URL 或純 base64
+            payload = part.data.split(",", 1)[1] if part.data.startswith("data:") else part.data
+            info = await blob_store.save_bytes(
+                base64.b64decode(payload), max_bytes=settings.attachment_max_bytes
+            )
+            blob_id = info.blob_id
+        if not blob_id:
+            continue
 
+        media_type = part.mediaType or "application/octet-stream"
+        data = await asyncio.to_thread(blob_store.read, blob_id)
+        file_parts.append(types.Part.from_bytes(data=data, mime_type=media_type))
+        attachments.append(
+            {"blobId": blob_id, "mediaType": media_type, "filename": part.filename}
+        )
+    return file_parts, attachments
+
+
+async def _lookup_user(user_id: str) -> Optional[User]:
+    """以 UUID 或 google_id 查詢用戶
+
+    agent run 在背景 task 執行，可能比請求本身活得久，因此不使用 request scope 的 db session。
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            # 嘗試將 user_id 轉換為 UUID
+            user_uuid = uuid.UUID(user_id)
+            result = await db.execute(select(User).where(User.id == user_uuid))
+        except ValueError:
+            # 如果不是 UUID 格式，可能是 google_id
+            result = await db.execute(select(User).where(User.google_id == user_id))
+        return result.scalars().first()
+
+
+@router.get("/chat/{message_id}/stream")
+async def resume_chat_stream(
+    message_id: str,
+    http_request: Request,
+    user_id: Optional[str] = None,
+):
+    """斷線續傳：從 Last-Event-ID 之後的 frame 繼續輸出（進行中或已完成的串流皆可）"""
+    record = get_stream_store().get(message_id)
+    if record is None or (record.owner and record.owner != user_id):
+        raise HTTPException(status_code=404, detail="Stream not found")
+
+    start = _resume_start(record, http_request)
+    CHAT_STREAM_RESUMES.inc()
+    return _follow_response(record, http_request, start=start)
+
+
+def _resume_start(record: StreamRecord, http_request: Request) -> int:
+    """依 Last-Event-ID（header 或 last_event_id query）決定續傳起點"""
+    last_event_id = http_request.headers.get("last-event-id") or http_request.query_params.get(
+        "last_event_id"
+    )
+    try:
+        start = int(last_event_id) + 1 if last_event_id else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    if start < record.base:
+        raise HTTPException(status_code=410, detail="Stream position expired")
+    return start
+
+
+def _follow_response(record: StreamRecord, http_request: Request, start: int = 0) -> StreamingResponse:
+    return _sse_response(
+        record.follow(
+            start=start,
+            heartbeat_seconds=settings.sse_heartbeat_seconds,
+            heartbeat_frame=HEARTBEAT_FRAME,
+            is_disconnected=http_request.is_disconnected,
+        )
+    )
+
+
+def _sse_response(body: AsyncIterator[bytes]) -> StreamingResponse:
     return StreamingResponse(
-        generate(),
+        body,
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -192,6 +488,13 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
     )
 
 
+@router.post("/chat/{message_id}/cancel")
+async def cancel_chat(message_id: str, user_id: Optional[str] = None):
+    """取消進行中的 agent run"""
+    cancelled = get_run_registry().cancel(message_id, user_id)
+    return {"cancelled": cancelled}
+
+
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
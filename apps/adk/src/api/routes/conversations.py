@@ -1,7 +1,7 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import delete, desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
 import uuid as uuid_module
@@ -55,41 +55,41 @@ class CreateConversationRequest(BaseModel):
 
 
 @router.get("", response_model=List[ConversationResponse])
-async def list_conversations(user_id: str, limit: int = 50, db: Session = Depends(get_db)):
+async def list_conversations(user_id: str, limit: int = 50, db: AsyncSession = Depends(get_db)):
     """列出使用者的所有對話（user_id 可以是 UUID 或 google_id）"""
     # 先嘗試用 google_id 查找使用者
-    user = db.query(User).filter(User.google_id == user_id).first()
+    user = (await db.execute(select(User).where(User.google_id == user_id))).scalars().first()
     if not user:
         # 如果不是 google_id，嘗試作為 UUID
         try:
             user_uuid = uuid_module.UUID(user_id)
-            user = db.query(User).filter(User.id == user_uuid).first()
+            user = (await db.execute(select(User).where(User.id == user_uuid))).scalars().first()
         except (ValueError, AttributeError):
             return []
 
     if not user:
         return []
 
-    conversations = (
-        db.query(Conversation)
-        .filter(Conversation.user_id == user.id)
+    result = await db.execute(
+        select(Conversation)
+        .where(Conversation.user_id == user.id)
         .order_by(desc(Conversation.updated_at))
         .limit(limit)
-        .all()
     )
+    conversations = result.scalars().all()
 
     return [ConversationResponse.from_db(conv) for conv in conversations]
 
 
 @router.get("/{conversation_id}", response_model=ConversationWithMessages)
-async def get_conversation(conversation_id: str, user_id: str, db: Session = Depends(get_db)):
+async def get_conversation(conversation_id: str, user_id: str, db: AsyncSession = Depends(get_db)):
     """取得特定對話及其訊息（user_id 可以是 UUID 或 google_id）"""
     # 先找到使用者
-    user = db.query(User).filter(User.google_id == user_id).first()
+    user = (await db.execute(select(User).where(User.google_id == user_id))).scalars().first()
     if not user:
         try:
             user_uuid = uuid_module.UUID(user_id)
-            user = db.query(User).filter(User.id == user_uuid).first()
+            user = (await db.execute(select(User).where(User.id == user_uuid))).scalars().first()
         except (ValueError, AttributeError):
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -102,16 +102,22 @@ async def get_conversation(conversation_id: str, user_id: str, db: Session = Dep
     except (ValueError, AttributeError):
         raise HTTPException(status_code=404, detail="Invalid conversation ID")
 
-    conversation = (
-        db.query(Conversation)
-        .filter(Conversation.id == conv_uuid, Conversation.user_id == user.id)
-        .first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conv_uuid, Conversation.user_id == user.id
+        )
     )
+    conversation = result.scalars().first()
 
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    messages = db.query(Message).filter(Message.conversation_id == conv_uuid).order_by(Message.created_at).all()
+    result = await db.execute(
+        select(Message)
+        .where(Message.conversation_id == conv_uuid)
+        .order_by(Message.created_at)
+    )
+    messages = result.scalars().all()
 
     return ConversationWithMessages(
         id=str(conversation.id),
@@ -134,11 +140,11 @@ async def get_conversation(conversation_id: str, user_id: str, db: Session = Dep
 
 @router.post("", response_model=ConversationResponse)
 async def create_conversation(
-    request: CreateConversationRequest, user_id: str, db: Session = Depends(get_db)
+    request: CreateConversationRequest, user_id: str, db: AsyncSession = Depends(get_db)
 ):
     """建立新對話（user_id 可以是 UUID 或 google_id）"""
     # 先嘗試用 google_id 查找使用者
-    user = db.query(User).filter(User.google_id == user_id).first()
+    user = (await db.execute(select(User).where(User.google_id == user_id))).scalars().first()
     if not user:
         # 如果找不到，建立新使用者
         user = User(
@@ -148,8 +154,8 @@ async def create_conversation(
             name="User",
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
     conversation = Conversation(
         id=uuid_module.uuid4(),
@@ -158,21 +164,21 @@ async def create_conversation(
     )
 
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation)
 
     return ConversationResponse.from_db(conversation)
 
 
 @router.delete("/{conversation_id}")
-async def delete_conversation(conversation_id: str, user_id: str, db: Session = Depends(get_db)):
+async def delete_conversation(conversation_id: str, user_id: str, db: AsyncSession = Depends(get_db)):
     """刪除對話及其所有訊息（user_id 可以是 UUID 或 google_id）"""
     # 先找到使用者
-    user = db.query(User).filter(User.google_id == user_id).first()
+    user = (await db.execute(select(User).where(User.google_id == user_id))).scalars().first()
     if not user:
         try:
             user_uuid = uuid_module.UUID(user_id)
-            user = db.query(User).filter(User.id == user_uuid).first()
+            user = (await db.execute(select(User).where(User.id == user_uuid))).scalars().first()
         except (ValueError, AttributeError):
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -185,36 +191,37 @@ async def delete_conversation(conversation_id: str, user_id: str, db: Session =
     except (ValueError, AttributeError):
         raise HTTPException(status_code=404, detail="Invalid conversation ID")
 
-    conversation = (
-        db.query(Conversation)
-        .filter(Conversation.id == conv_uuid, Conversation.user_id == user.id)
-        .first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conv_uuid, Conversation.user_id == user.id
+        )
     )
+    conversation = result.scalars().first()
 
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     # 刪除相關訊息
-    db.query(Message).filter(Message.conversation_id == conv_uuid).delete()
+    await db.execute(delete(Message).where(Message.conversation_id == conv_uuid))
 
     # 刪除對話
-    db.delete(conversation)
-    db.commit()
+    await db.delete(conversation)
+    await db.commit()
 
     return {"success": True}
 
 
 @router.patch("/{conversation_id}/title", response_model=ConversationResponse)
 async def update_conversation_title(
-    conversation_id: str, user_id: str, title: str, db: Session = Depends(get_db)
+    conversation_id: str, user_id: str, title: str, db: AsyncSession = Depends(get_db)
 ):
     """更新對話標題（user_id 可以是 UUID 或 google_id）"""
     # 先找到使用者
-    user = db.query(User).filter(User.google_id == user_id).first()
+    user = (await db.execute(select(User).where(User.google_id == user_id))).scalars().first()
     if not user:
         try:
             user_uuid = uuid_module.UUID(user_id)
-            user = db.query(User).filter(User.id == user_uuid).first()
+            user = (await db.execute(select(User).where(User.id == user_uuid))).scalars().first()
         except (ValueError, AttributeError):
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -227,17 +234,18 @@ async def update_conversation_title(
     except (ValueError, AttributeError):
         raise HTTPException(status_code=404, detail="Invalid conversation ID")
 
-    conversation = (
-        db.query(Conversation)
-        .filter(Conversation.id == conv_uuid, Conversation.user_id == user.id)
-        .first()
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conv_uuid, Conversation.user_id == user.id
+        )
     )
+    conversation = result.scalars().first()
 
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     conversation.title = title
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation)
 
     return ConversationResponse.from_db(conversation)
@@ -1,7 +1,7 @@
 from urllib.parse import urlencode
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import httpx
 
 from ...db.session import get_db
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/auth/google", tags=["oauth"])
 
 
 @router.get("/calendar")
-async def initiate_calendar_oauth(user_id: str, db: Session = Depends(get_db)):
+async def initiate_calendar_oauth(user_id: str, db: AsyncSession = Depends(get_db)):
     """產生 Google OAuth URL，導向用戶授權 Calendar"""
 
     # 建立 OAuth URL
@@ -36,7 +36,7 @@ async def initiate_calendar_oauth(user_id: str, db: Session = Depends(get_db)):
 
 @router.get("/callback")
 async def handle_oauth_callback(
-    code: str, state: str, db: Session = Depends(get_db)
+    code: str, state: str, db: AsyncSession = Depends(get_db)
 ):
     """處理 OAuth callback，換取 tokens 並儲存"""
 
@@ -46,7 +46,7 @@ async def handle_oauth_callback(
         # 換取 tokens
         async with httpx.AsyncClient() as client:
             response = await client.post(
-                "https://oauth2.googleapis.com/token",
+                settings.google_oauth_token_url,
                 data={
                     "client_id": settings.google_client_id,
                     "client_secret": settings.google_client_secret,
@@ -84,17 +84,17 @@ async def handle_oauth_callback(
 
 
 @router.get("/status")
-async def check_calendar_status(user_id: str, db: Session = Depends(get_db)):
+async def check_calendar_status(user_id: str, db: AsyncSession = Depends(get_db)):
     """檢查用戶是否已授權 Calendar"""
 
     token_service = TokenService(db)
-    has_token = token_service.has_valid_token(user_id, "google_calendar")
+    has_token = await token_service.has_valid_token(user_id, "google_calendar")
 
     return {"connected": has_token}
 
 
 @router.delete("/revoke")
-async def revoke_calendar_access(user_id: str, db: Session = Depends(get_db)):
+async def revoke_calendar_access(user_id: str, db: AsyncSession = Depends(get_db)):
     """撤銷 Calendar 授權"""
 
     token_service = TokenService(db)
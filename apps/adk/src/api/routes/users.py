@@ -1,7 +1,8 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...db.session import get_db
 from ...db.models import User
@@ -29,21 +30,22 @@ class UserResponse(BaseModel):
 
 
 @router.post("/sync", response_model=UserResponse)
-async def sync_user(request: CreateUserRequest, db: Session = Depends(get_db)):
+async def sync_user(request: CreateUserRequest, db: AsyncSession = Depends(get_db)):
     """
     同步用戶資訊：如果用戶不存在則創建，存在則更新
     用於 NextAuth 登入後同步用戶資訊到資料庫
     """
     # 檢查用戶是否已存在
-    user = db.query(User).filter(User.google_id == request.google_id).first()
+    result = await db.execute(select(User).where(User.google_id == request.google_id))
+    user = result.scalars().first()
 
     if user:
         # 更新現有用戶資訊
         user.email = request.email
         user.name = request.name
         user.image = request.image
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         print(f"[DEBUG] Updated user: {user.email}")
     else:
         # 創建新用戶
@@ -54,8 +56,8 @@ async def sync_user(request: CreateUserRequest, db: Session = Depends(get_db)):
             image=request.image,
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         print(f"[DEBUG] Created new user: {user.email}")
 
     return UserResponse(
@@ -68,9 +70,10 @@ async def sync_user(request: CreateUserRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/{google_id}", response_model=UserResponse)
-async def get_user(google_id: str, db: Session = Depends(get_db)):
+async def get_user(google_id: str, db: AsyncSession = Depends(get_db)):
     """根據 google_id 查詢用戶"""
-    user = db.query(User).filter(User.google_id == google_id).first()
+    result = await db.execute(select(User).where(User.google_id == google_id))
+    user = result.scalars().first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
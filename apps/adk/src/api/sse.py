@@ -0,0 +1,134 @@
+"""SSE 串流輸出（AI SDK data stream protocol）"""
+import asyncio
+from typing import Any, AsyncIterator
+
+import orjson
+
+FINISH_FRAME = b'data: {"type":"finish","finishReason":"stop"}\n\n'
+# SSE 註解行，讓 proxy 不會因閒置而斷線，也用來偵測已斷線的 client
+HEARTBEAT_FRAME = b": ping\n\n"
+
+# 佇列中的結束標記
+_END = object()
+
+
+def encode_frame(payload: dict[str, Any]) -> bytes:
+    """將 payload 編碼為單一 SSE frame"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def error_frame(error: str, **extra: Any) -> bytes:
+    return encode_frame({"type": "error", "error": error, **extra})
+
+
+class SSEWriter:
+    """單一訊息的 SSE frame 編碼器，含 message id 的前綴只編碼一次"""
+
+    def __init__(self, message_id: str):
+        self.message_id = message_id
+        encoded_id = orjson.dumps(message_id)
+        self._start = b'data: {"type":"start","messageId":' + encoded_id + b"}\n\n"
+        self._text_start = b'data: {"type":"text-start","id":' + encoded_id + b"}\n\n"
+        self._text_end = b'data: {"type":"text-end","id":' + encoded_id + b"}\n\n"
+        self._delta_prefix = b'data: {"type":"text-delta","id":' + encoded_id + b',"delta":'
+
+    def start(self) -> bytes:
+        return self._start
+
+    def text_start(self) -> bytes:
+        return self._text_start
+
+    def text_delta(self, text: str) -> bytes:
+        return self._delta_prefix + orjson.dumps(text) + b"}\n\n"
+
+    def text_end(self) -> bytes:
+        return self._text_end
+
+    def finish(self) -> bytes:
+        return FINISH_FRAME
+
+
+class _Failure:
+    """包裝 producer 端拋出的例外"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class DeltaStream:
+    """合併時間窗內或累積到 max_bytes 的文字片段
+
+    source 在單一背景 task 中迭代（ADK run_async 的 tracing context 需在同一個 task 內），
+    透過佇列交給迭代端合併輸出。cancel() 或停止迭代時會取消背景 task。
+    """
+
+    def __init__(
+        self,
+        source: AsyncIterator[str],
+        window_seconds: float,
+        max_bytes: int,
+    ):
+        self.window_seconds = window_seconds
+        self.max_bytes = max_bytes
+        self.cancelled = False
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for text in source:
+                self._queue.put_nowait(text)
+            self._queue.put_nowait(_END)
+        except asyncio.CancelledError:
+            self._queue.put_nowait(_END)
+            raise
+        except Exception as e:
+            self._queue.put_nowait(_Failure(e))
+
+    def cancel(self) -> None:
+        """取消背景執行（agent run 與進行中的 tool 呼叫）"""
+        if not self._task.done():
+            self.cancelled = True
+            self._task.cancel()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        buffer: list[str] = []
+        size = 0
+        deadline = None
+
+        try:
+            while True:
+                if deadline is None:
+                    item = await self._queue.get()
+                else:
+                    try:
+                        item = await asyncio.wait_for(
+                            self._queue.get(), max(deadline - loop.time(), 0)
+                        )
+                    except asyncio.TimeoutError:
+                        # 時間窗結束，送出目前累積的內容
+                        yield "".join(buffer)
+                        buffer.clear()
+                        size = 0
+                        deadline = None
+                        continue
+
+                if item is _END or isinstance(item, _Failure):
+                    if buffer:
+                        yield "".join(buffer)
+                    if isinstance(item, _Failure):
+                        raise item.error
+                    return
+
+                buffer.append(item)
+                size += len(item.encode("utf-8"))
+                if size >= self.max_bytes or self.window_seconds <= 0:
+                    yield "".join(buffer)
+                    buffer.clear()
+                    size = 0
+                    deadline = None
+                elif deadline is None:
+                    deadline = loop.time() + self.window_seconds
+        finally:
+            self.cancel()
@@ -1,3 +1,6 @@
+# App Name (ADK Runner / Session)
+APP_NAME = "agents"
+
 # Agent Names
 ROOT_AGENT_NAME = "assistant"
 CALENDAR_AGENT_NAME = "calendar_agent"
@@ -5,6 +8,8 @@ CALENDAR_AGENT_NAME = "calendar_agent"
 # Model Names
 ROOT_AGENT_MODEL = "gemini-2.5-flash-lite"
 SUB_AGENT_MODEL = "gemini-2.0-flash-lite"
+# 對話歷史壓縮摘要
+SUMMARY_MODEL = "gemini-2.0-flash-lite"
 
 # Paths
 PROMPTS_DIR = "src/prompts"
@@ -1,5 +1,29 @@
 from .base import Base
-from .models import User, UserToken, Conversation, Message
-from .session import get_db, engine
+from .models import (
+    User,
+    UserToken,
+    Conversation,
+    Message,
+    Attachment,
+    AdkSession,
+    AdkEvent,
+    AdkAppState,
+    AdkUserState,
+)
+from .session import get_db, engine, AsyncSessionLocal
 
-__all__ = ["Base", "User", "UserToken", "Conversation", "Message", "get_db", "engine"]
+__all__ = [
+    "Base",
+    "User",
+    "UserToken",
+    "Conversation",
+    "Message",
+    "Attachment",
+    "AdkSession",
+    "AdkEvent",
+    "AdkAppState",
+    "AdkUserState",
+    "get_db",
+    "engine",
+    "AsyncSessionLocal",
+]
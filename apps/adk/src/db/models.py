@@ -1,9 +1,20 @@
 import uuid
 from datetime import datetime
-from typing import Optional, List
-from sqlalchemy import String, Text, DateTime, ForeignKey, ARRAY
+from typing import Any, Optional, List
+from sqlalchemy import (
+    ARRAY,
+    BigInteger,
+    DateTime,
+    Float,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    String,
+    Text,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 
 from .base import Base
 
@@ -116,3 +127,97 @@ class Message(Base):
     conversation: Mapped["Conversation"] = relationship(
         "Conversation", back_populates="messages"
     )
+
+
+class Attachment(Base):
+    """使用者上傳的附件（內容存於 blob store），記錄上傳時的 media type 與大小"""
+
+    __tablename__ = "attachments"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    blob_id: Mapped[str] = mapped_column(String(64), primary_key=True, index=True)
+    media_type: Mapped[str] = mapped_column(String(255))
+    size: Mapped[int] = mapped_column(BigInteger)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class AdkSession(Base):
+    """ADK session（對話狀態），events 另存於 adk_events"""
+
+    __tablename__ = "adk_sessions"
+
+    app_name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    state: Mapped[dict[str, Any]] = mapped_column(JSONB, default=dict)
+    # 已寫入的 event 數；append 時在此列的 row lock 下遞增，作為 event 的 position
+    event_count: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class AdkEvent(Base):
+    """ADK event，append-only，每個 event 一列"""
+
+    __tablename__ = "adk_events"
+
+    seq: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    app_name: Mapped[str] = mapped_column(String(128))
+    user_id: Mapped[str] = mapped_column(String(255))
+    session_id: Mapped[str] = mapped_column(String(128))
+    # session 內的順序（1 起算），依 commit 順序遞增，不會有晚 commit 的較小值
+    position: Mapped[int] = mapped_column(BigInteger)
+    event_id: Mapped[str] = mapped_column(String(128))
+    invocation_id: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
+    author: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
+    timestamp: Mapped[float] = mapped_column(Float)
+    data: Mapped[dict[str, Any]] = mapped_column(JSONB)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["app_name", "user_id", "session_id"],
+            ["adk_sessions.app_name", "adk_sessions.user_id", "adk_sessions.id"],
+            ondelete="CASCADE",
+        ),
+        Index(
+            "ix_adk_events_session_position",
+            "app_name",
+            "user_id",
+            "session_id",
+            "position",
+            unique=True,
+        ),
+    )
+
+
+class AdkAppState(Base):
+    """ADK app 層級 state（app: 前綴）"""
+
+    __tablename__ = "adk_app_states"
+
+    app_name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    state: Mapped[dict[str, Any]] = mapped_column(JSONB, default=dict)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class AdkUserState(Base):
+    """ADK user 層級 state（user: 前綴）"""
+
+    __tablename__ = "adk_user_states"
+
+    app_name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[dict[str, Any]] = mapped_column(JSONB, default=dict)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
@@ -22,7 +22,17 @@ if config.config_file_name is not None:
 
 # 匯入所有 models
 from src.db.base import Base
-from src.db.models import User, UserToken, Conversation, Message
+from src.db.models import (
+    User,
+    UserToken,
+    Conversation,
+    Message,
+    Attachment,
+    AdkSession,
+    AdkEvent,
+    AdkAppState,
+    AdkUserState,
+)
 
 target_metadata = Base.metadata
 
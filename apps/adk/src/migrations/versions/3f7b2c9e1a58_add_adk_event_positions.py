@@ -0,0 +1,59 @@
+"""add adk event positions
+
+Revision ID: 3f7b2c9e1a58
+Revises: 8d4a1f6e3b92
+Create Date: 2026-10-17 17:05:44.630182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7b2c9e1a58'
+down_revision: Union[str, None] = '8d4a1f6e3b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('adk_sessions', sa.Column('event_count', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('adk_events', sa.Column('position', sa.BigInteger(), nullable=True))
+    # 既有 events 依 seq 編號
+    op.execute(
+        """
+        UPDATE adk_events AS e SET position = numbered.position
+        FROM (
+            SELECT seq, row_number() OVER (
+                PARTITION BY app_name, user_id, session_id ORDER BY seq
+            ) AS position
+            FROM adk_events
+        ) AS numbered
+        WHERE e.seq = numbered.seq
+        """
+    )
+    op.execute(
+        """
+        UPDATE adk_sessions AS s SET event_count = counts.event_count
+        FROM (
+            SELECT app_name, user_id, session_id, count(*) AS event_count
+            FROM adk_events
+            GROUP BY app_name, user_id, session_id
+        ) AS counts
+        WHERE s.app_name = counts.app_name
+          AND s.user_id = counts.user_id
+          AND s.id = counts.session_id
+        """
+    )
+    op.alter_column('adk_events', 'position', nullable=False)
+    op.drop_index('ix_adk_events_session_seq', table_name='adk_events')
+    op.create_index('ix_adk_events_session_position', 'adk_events', ['app_name', 'user_id', 'session_id', 'position'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_adk_events_session_position', table_name='adk_events')
+    op.create_index('ix_adk_events_session_seq', 'adk_events', ['app_name', 'user_id', 'session_id', 'seq'], unique=False)
+    op.drop_column('adk_events', 'position')
+    op.drop_column('adk_sessions', 'event_count')
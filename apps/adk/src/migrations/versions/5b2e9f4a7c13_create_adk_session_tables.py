@@ -0,0 +1,65 @@
+"""create adk session tables
+
+Revision ID: 5b2e9f4a7c13
+Revises: c0d704fe1f40
+Create Date: 2026-10-17 10:12:31.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e9f4a7c13'
+down_revision: Union[str, None] = 'c0d704fe1f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('adk_sessions',
+    sa.Column('app_name', sa.String(length=128), nullable=False),
+    sa.Column('user_id', sa.String(length=255), nullable=False),
+    sa.Column('id', sa.String(length=128), nullable=False),
+    sa.Column('state', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('app_name', 'user_id', 'id')
+    )
+    op.create_table('adk_events',
+    sa.Column('seq', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('app_name', sa.String(length=128), nullable=False),
+    sa.Column('user_id', sa.String(length=255), nullable=False),
+    sa.Column('session_id', sa.String(length=128), nullable=False),
+    sa.Column('event_id', sa.String(length=128), nullable=False),
+    sa.Column('invocation_id', sa.String(length=256), nullable=True),
+    sa.Column('author', sa.String(length=256), nullable=True),
+    sa.Column('timestamp', sa.Float(), nullable=False),
+    sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.ForeignKeyConstraint(['app_name', 'user_id', 'session_id'], ['adk_sessions.app_name', 'adk_sessions.user_id', 'adk_sessions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_adk_events_session_seq', 'adk_events', ['app_name', 'user_id', 'session_id', 'seq'], unique=False)
+    op.create_table('adk_app_states',
+    sa.Column('app_name', sa.String(length=128), nullable=False),
+    sa.Column('state', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('app_name')
+    )
+    op.create_table('adk_user_states',
+    sa.Column('app_name', sa.String(length=128), nullable=False),
+    sa.Column('user_id', sa.String(length=255), nullable=False),
+    sa.Column('state', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('app_name', 'user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('adk_user_states')
+    op.drop_table('adk_app_states')
+    op.drop_index('ix_adk_events_session_seq', table_name='adk_events')
+    op.drop_table('adk_events')
+    op.drop_table('adk_sessions')
@@ -0,0 +1,36 @@
+"""create attachments table
+
+Revision ID: 8d4a1f6e3b92
+Revises: 5b2e9f4a7c13
+Create Date: 2026-10-17 16:40:08.215734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4a1f6e3b92'
+down_revision: Union[str, None] = '5b2e9f4a7c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('attachments',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('blob_id', sa.String(length=64), nullable=False),
+    sa.Column('media_type', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'blob_id')
+    )
+    op.create_index(op.f('ix_attachments_blob_id'), 'attachments', ['blob_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_attachments_blob_id'), table_name='attachments')
+    op.drop_table('attachments')
@@ -0,0 +1,147 @@
+"""Chat 請求的准入控制：全域並行上限、每位使用者的 token bucket 與有界等待佇列"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+from ..config import settings
+from .metrics import (
+    CHAT_ADMISSION_REJECTED,
+    CHAT_QUEUE_WAIT_SECONDS,
+    REGISTRY,
+)
+
+
+class AdmissionRejected(Exception):
+    """請求未被受理（reason: rate_limited / queue_full / queue_timeout）"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_available(self) -> float:
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else 60.0
+
+
+class AdmissionController:
+    """限制同時執行的 agent run 數量，超出時排隊等待，佇列滿或逾時則拒絕"""
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        user_rate: float,
+        user_burst: float,
+        max_tracked_users: int = 10000,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_tracked_users = max_tracked_users
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _bucket(self, user_key: str) -> TokenBucket:
+        bucket = self._buckets.get(user_key)
+        if bucket is None:
+            bucket = self._buckets[user_key] = TokenBucket(self.user_rate, self.user_burst)
+            while len(self._buckets) > self.max_tracked_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_key)
+        return bucket
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        CHAT_ADMISSION_REJECTED.inc(reason=reason)
+        return AdmissionRejected(reason, retry_after)
+
+    async def acquire(self, user_key: str) -> None:
+        """取得執行名額，必須搭配 release()"""
+        bucket = self._bucket(user_key)
+        if not bucket.take():
+            raise self._reject("rate_limited", bucket.seconds_until_available())
+
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            CHAT_QUEUE_WAIT_SECONDS.observe(0.0)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full", self.queue_timeout)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started_at = time.perf_counter()
+        try:
+            # release() 會直接把名額轉交給排在最前面的 waiter
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # 逾時前一刻 release() 已轉交名額時，需把名額還回去
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise self._reject("queue_timeout", self.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        CHAT_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - started_at)
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+admission_controller = AdmissionController(
+    max_concurrent=settings.chat_max_concurrent,
+    max_queue=settings.chat_max_queue,
+    queue_timeout=settings.chat_queue_timeout_seconds,
+    user_rate=settings.chat_user_rate_per_second,
+    user_burst=settings.chat_user_burst,
+)
+
+REGISTRY.gauge(
+    "chat_admission",
+    "Active agent runs and queued chat requests",
+    ["state"],
+    callback=lambda: {
+        ("active",): admission_controller.active,
+        ("queued",): admission_controller.queue_depth,
+    },
+)
+
+
+def get_admission_controller() -> AdmissionController:
+    """獲取全局 admission controller"""
+    return admission_controller
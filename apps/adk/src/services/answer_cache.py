@@ -0,0 +1,106 @@
+"""對話回覆的快取（opt-in）
+
+key 由 agent 版本、快取範圍（登入用戶）、先前對話內容與正規化後的使用者輸入組成；
+只快取未呼叫任何 tool 的回覆。
+"""
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .. import constants
+from ..config import settings
+from .metrics import CHAT_ANSWER_CACHE_LOOKUPS, REGISTRY
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """全半形、大小寫與空白差異視為相同輸入"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def compute_agent_version() -> str:
+    """prompts/*.md 與 constants 中的 agent / model 設定的雜湊，任一變更即讓快取失效"""
+    digest = hashlib.sha256()
+    prompts_dir = Path(__file__).parent.parent / constants.PROMPTS_DIR.replace("src/", "")
+    for path in sorted(prompts_dir.glob("*.md")):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(path.read_bytes())
+    for name in (
+        "ROOT_AGENT_NAME",
+        "ROOT_AGENT_MODEL",
+        "CALENDAR_AGENT_NAME",
+        "SUB_AGENT_MODEL",
+        "SUMMARY_MODEL",
+    ):
+        digest.update(f"{name}={getattr(constants, name)}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class AnswerCache:
+    """LRU + TTL 的回覆快取"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, version: str):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+        # key -> (寫入時間, 回覆內容)
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def make_key(
+        self, history: Sequence[tuple[str, str]], prompt: str, scope: str = ""
+    ) -> str:
+        """history 為先前的 (role, content)，回覆依賴對話脈絡，因此一併納入 key；
+        scope 區隔不可共用的回覆（例如 instruction 含有用戶資訊的登入用戶）
+        """
+        digest = hashlib.sha256(self.version.encode("utf-8"))
+        digest.update(b"\x02" + scope.encode("utf-8"))
+        for role, content in history:
+            digest.update(b"\x00" + role.encode("utf-8") + b"\x00")
+            digest.update(normalize_prompt(content).encode("utf-8"))
+        digest.update(b"\x01" + normalize_prompt(prompt).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            CHAT_ANSWER_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        self._entries.move_to_end(key)
+        CHAT_ANSWER_CACHE_LOOKUPS.inc(result="hit")
+        return entry[1]
+
+    def put(self, key: str, answer: str) -> None:
+        self._entries[key] = (time.monotonic(), answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+answer_cache = AnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+    version=compute_agent_version(),
+)
+
+REGISTRY.gauge(
+    "chat_answer_cache",
+    "Answer cache entries",
+    ["stat"],
+    callback=lambda: {("entries",): len(answer_cache)},
+)
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """獲取全局 answer cache；未啟用時回傳 None"""
+    return answer_cache if settings.answer_cache_enabled else None
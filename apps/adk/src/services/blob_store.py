@@ -0,0 +1,102 @@
+"""以 SHA-256 定址的本機檔案儲存，用於對話附件
+
+相同內容只存一份；檔案路徑為 <root>/<前兩碼>/<完整 hash>。
+"""
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator
+
+from ..config import settings
+
+_BLOB_ID = re.compile(r"^[0-9a-f]{64}$")
+# 累積到這個大小才寫入磁碟，減少 thread 切換
+_WRITE_CHUNK = 1024 * 1024
+
+
+class BlobTooLarge(Exception):
+    """上傳內容超過大小上限"""
+
+
+class InvalidBlobId(ValueError):
+    """blob id 不是合法的 SHA-256 hex"""
+
+
+@dataclass(frozen=True)
+class BlobInfo:
+    blob_id: str
+    size: int
+
+
+class BlobStore:
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self._tmp = self.root / "tmp"
+
+    def path(self, blob_id: str) -> Path:
+        if not _BLOB_ID.match(blob_id):
+            raise InvalidBlobId(blob_id)
+        return self.root / blob_id[:2] / blob_id
+
+    def exists(self, blob_id: str) -> bool:
+        return self.path(blob_id).is_file()
+
+    async def save(self, chunks: AsyncIterator[bytes], max_bytes: int) -> BlobInfo:
+        """邊接收邊計算 hash 並寫入暫存檔，完成後搬到最終位置（已存在則捨棄）"""
+        self._tmp.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self._tmp)
+        digest = hashlib.sha256()
+        size = 0
+        pending: list[bytes] = []
+        pending_size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise BlobTooLarge(f"Attachment exceeds {max_bytes} bytes")
+                    digest.update(chunk)
+                    pending.append(chunk)
+                    pending_size += len(chunk)
+                    if pending_size >= _WRITE_CHUNK:
+                        await asyncio.to_thread(f.writelines, pending)
+                        pending, pending_size = [], 0
+                if pending:
+                    await asyncio.to_thread(f.writelines, pending)
+
+            blob_id = digest.hexdigest()
+            await asyncio.to_thread(self._commit, tmp_name, self.path(blob_id))
+            return BlobInfo(blob_id=blob_id, size=size)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+    async def save_bytes(self, data: bytes, max_bytes: int) -> BlobInfo:
+        async def single() -> AsyncIterator[bytes]:
+            yield data
+
+        return await self.save(single(), max_bytes)
+
+    @staticmethod
+    def _commit(tmp_name: str, final: Path) -> None:
+        if final.exists():
+            # 相同內容已存在，不重複寫入
+            return
+        final.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_name, final)
+
+    def read(self, blob_id: str) -> bytes:
+        """讀取完整內容（送給 model 的 types.Part 需要 bytes）"""
+        return self.path(blob_id).read_bytes()
+
+
+blob_store = BlobStore(settings.blob_store_dir)
+
+
+def get_blob_store() -> BlobStore:
+    """獲取全局 blob store"""
+    return blob_store
@@ -0,0 +1,356 @@
+"""Google Calendar v3 的 async client（httpx，整個 process 共用連線池，支援 HTTP/2）"""
+import asyncio
+import uuid
+from typing import Any, AsyncIterator, Optional
+from urllib.parse import quote, urlencode
+
+import httpx
+import orjson
+
+from ..config import settings
+
+
+class CalendarApiError(Exception):
+    """Calendar API 回傳錯誤狀態碼"""
+
+    def __init__(self, status_code: int, message: str, reason: Optional[str] = None):
+        super().__init__(f"Calendar API error {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.reason = reason
+
+
+def _api_error(status_code: int, reason_phrase: str, content: bytes) -> CalendarApiError:
+    """由 Google API 格式的錯誤回應建立 CalendarApiError"""
+    message, reason = reason_phrase, None
+    try:
+        error = orjson.loads(content)["error"]
+        message = error.get("message", message)
+        reason = (error.get("errors") or [{}])[0].get("reason")
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        pass
+    return CalendarApiError(status_code, message, reason)
+
+
+def _transport_error(error: httpx.HTTPError) -> CalendarApiError:
+    """連線逾時或中斷轉為 CalendarApiError，讓 tool 回傳錯誤結果而不是中斷整個 agent 回合"""
+    if isinstance(error, httpx.TimeoutException):
+        return CalendarApiError(504, f"Calendar API timeout: {error!r}", "timeout")
+    return CalendarApiError(503, f"Calendar API unreachable: {error!r}", "transportError")
+
+
+# Google batch API 單一請求最多可包含的子請求數
+BATCH_MAX_REQUESTS = 50
+
+# partial response：只取回 tools 與事件鏡像會用到的欄位
+EVENT_FIELDS = "id,etag,status,summary,description,location,start,end,recurrence,htmlLink"
+EVENT_LIST_FIELDS = f"items({EVENT_FIELDS}),nextPageToken,nextSyncToken,timeZone"
+
+
+class CalendarClient:
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float,
+        connect_timeout: float,
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        http2: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if http2 and transport is None:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("[DEBUG] h2 not installed, Calendar client falls back to HTTP/1.1")
+                http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=http2,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+        # batch 子請求需使用絕對路徑（例如 /calendar/v3/calendars/...）
+        base = httpx.URL(base_url)
+        self._path_prefix = base.path
+        self._batch_url = base.join("../../batch/calendar/v3")
+
+    @staticmethod
+    def events_path(calendar_id: str, event_id: Optional[str] = None) -> str:
+        path = f"calendars/{quote(calendar_id, safe='')}/events"
+        if event_id is not None:
+            path += f"/{quote(event_id, safe='')}"
+        return path
+
+    @staticmethod
+    def with_fields(path: str, fields: Optional[str] = EVENT_FIELDS) -> str:
+        """在路徑後加上 fields 參數（batch 子請求用）"""
+        return f"{path}?{urlencode({'fields': fields})}" if fields else path
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        access_token: str,
+        params: Optional[dict[str, Any]] = None,
+        body: Optional[dict[str, Any]] = None,
+        if_match: Optional[str] = None,
+    ) -> Optional[dict[str, Any]]:
+        headers = {"Authorization": f"Bearer {access_token}"}
+        if if_match:
+            headers["If-Match"] = if_match
+        content = None
+        if body is not None:
+            content = orjson.dumps(body)
+            headers["Content-Type"] = "application/json"
+        try:
+            response = await self._client.request(
+                method,
+                path,
+                params={k: v for k, v in (params or {}).items() if v is not None},
+                content=content,
+                headers=headers,
+            )
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+
+        if response.status_code >= 400:
+            raise _api_error(response.status_code, response.reason_phrase, response.content)
+
+        if response.status_code == 204 or not response.content:
+            return None
+        return orjson.loads(response.content)
+
+    async def list_events(
+        self,
+        access_token: str,
+        calendar_id: str = "primary",
+        fields: Optional[str] = EVENT_LIST_FIELDS,
+        **params: Any,
+    ) -> dict[str, Any]:
+        return await self._request(
+            "GET",
+            self.events_path(calendar_id),
+            access_token,
+            params={**params, "fields": fields},
+        )
+
+    async def iter_pages(
+        self,
+        access_token: str,
+        calendar_id: str = "primary",
+        page_size: int = 250,
+        page_token: Optional[str] = None,
+        fields: Optional[str] = EVENT_LIST_FIELDS,
+        **params: Any,
+    ) -> AsyncIterator[tuple[Optional[str], list[dict[str, Any]]]]:
+        """逐頁產生 (取得該頁所用的 pageToken, events)，需要時才依 nextPageToken 取下一頁
+
+        呼叫端提早停止時請以 contextlib.aclosing 包裝，確保不再送出後續請求。
+        """
+        while True:
+            page = await self.list_events(
+                access_token,
+                calendar_id,
+                fields=fields,
+                maxResults=page_size,
+                pageToken=page_token,
+                **params,
+            )
+            yield page_token, page.get("items", [])
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+
+    async def insert_event(
+        self,
+        access_token: str,
+        body: dict[str, Any],
+        calendar_id: str = "primary",
+        fields: Optional[str] = EVENT_FIELDS,
+    ) -> dict[str, Any]:
+        return await self._request(
+            "POST",
+            self.events_path(calendar_id),
+            access_token,
+            params={"fields": fields},
+            body=body,
+        )
+
+    async def patch_event(
+        self,
+        access_token: str,
+        event_id: str,
+        body: dict[str, Any],
+        calendar_id: str = "primary",
+        fields: Optional[str] = EVENT_FIELDS,
+        if_match: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """只修改 body 中的欄位（PATCH）；帶 if_match（etag）時，事件已被他人修改會回傳 412"""
+        return await self._request(
+            "PATCH",
+            self.events_path(calendar_id, event_id),
+            access_token,
+            params={"fields": fields},
+            body=body,
+            if_match=if_match,
+        )
+
+    async def delete_event(
+        self,
+        access_token: str,
+        event_id: str,
+        calendar_id: str = "primary",
+        if_match: Optional[str] = None,
+    ) -> None:
+        await self._request(
+            "DELETE",
+            self.events_path(calendar_id, event_id),
+            access_token,
+            if_match=if_match,
+        )
+
+    async def batch(
+        self,
+        access_token: str,
+        requests: list[tuple[str, str, Optional[dict[str, Any]], Optional[str]]],
+    ) -> list[dict[str, Any] | CalendarApiError | None]:
+        """以 multipart batch API 送出多個 (method, path, body, if_match) 子請求
+
+        每 BATCH_MAX_REQUESTS 個子請求為一個 HTTP 請求（並行送出）。回傳值順序與 requests 相同：
+        成功為回應 body（204 為 None），失敗為 CalendarApiError；某個 HTTP 請求整體失敗時，
+        只有該 chunk 的子請求為 CalendarApiError。
+        """
+        chunks = [
+            requests[i:i + BATCH_MAX_REQUESTS]
+            for i in range(0, len(requests), BATCH_MAX_REQUESTS)
+        ]
+        # 某個 chunk 失敗時，其他已送出的 chunk 結果仍要回傳（那些寫入已經生效）
+        results = await asyncio.gather(
+            *(self._send_batch(access_token, chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
+        items: list[dict[str, Any] | CalendarApiError | None] = []
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, CalendarApiError):
+                items.extend([result] * len(chunk))
+            elif isinstance(result, Exception):
+                error = CalendarApiError(502, f"Invalid batch response: {result!r}")
+                items.extend([error] * len(chunk))
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                items.extend(result)
+        return items
+
+    async def _send_batch(
+        self,
+        access_token: str,
+        requests: list[tuple[str, str, Optional[dict[str, Any]], Optional[str]]],
+    ) -> list[dict[str, Any] | CalendarApiError | None]:
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for index, (method, path, body, if_match) in enumerate(requests):
+            lines = [
+                f"--{boundary}",
+                "Content-Type: application/http",
+                f"Content-ID: <item{index}>",
+                "",
+                f"{method} {self._path_prefix}{path} HTTP/1.1",
+            ]
+            if if_match:
+                lines.append(f"If-Match: {if_match}")
+            if body is not None:
+                lines += ["Content-Type: application/json", "", orjson.dumps(body).decode()]
+            else:
+                lines.append("")
+            parts.append("\r\n".join(lines))
+        payload = "\r\n".join(parts) + f"\r\n--{boundary}--\r\n"
+
+        try:
+            response = await self._client.post(
+                self._batch_url,
+                content=payload.encode(),
+                headers={
+                    "Authorization": f"Bearer {access_token}",
+                    "Content-Type": f"multipart/mixed; boundary={boundary}",
+                },
+            )
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+        if response.status_code >= 400:
+            raise _api_error(response.status_code, response.reason_phrase, response.content)
+
+        results: list[dict[str, Any] | CalendarApiError | None] = [
+            CalendarApiError(502, "Missing batch response part")
+        ] * len(requests)
+        for index, status_code, reason_phrase, content in _parse_batch_response(response):
+            if not 0 <= index < len(requests):
+                continue
+            if status_code >= 400:
+                results[index] = _api_error(status_code, reason_phrase, content)
+            else:
+                results[index] = orjson.loads(content) if content.strip() else None
+        return results
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def _parse_batch_response(response: httpx.Response):
+    """逐一產生 batch 回應中各 part 的 (index, status_code, reason_phrase, body)"""
+    boundary = None
+    for param in response.headers.get("content-type", "").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary":
+            boundary = value.strip('"')
+    if not boundary:
+        raise CalendarApiError(502, "Batch response is not multipart")
+
+    content = response.content.replace(b"\r\n", b"\n")
+    for part in content.split(b"--" + boundary.encode())[1:]:
+        if part.startswith(b"--"):
+            break
+        part_headers, _, http_response = part.strip(b"\n").partition(b"\n\n")
+        index = -1
+        for line in part_headers.split(b"\n"):
+            key, _, value = line.decode().partition(":")
+            if key.strip().lower() == "content-id":
+                # 回應的 Content-ID 為 <response-item{index}>
+                index = int(value.strip().strip("<>").rpartition("item")[2] or -1)
+        head, _, body = http_response.partition(b"\n\n")
+        status_line = head.split(b"\n", 1)[0].decode().split(" ", 2)
+        yield index, int(status_line[1]), status_line[2] if len(status_line) > 2 else "", body
+
+
+_calendar_client: Optional[CalendarClient] = None
+
+
+def get_calendar_client() -> CalendarClient:
+    """獲取全局 Calendar client（第一次使用時建立）"""
+    global _calendar_client
+    if _calendar_client is None:
+        _calendar_client = CalendarClient(
+            base_url=settings.google_calendar_api_url,
+            timeout=settings.calendar_timeout_seconds,
+            connect_timeout=settings.calendar_connect_timeout_seconds,
+            max_connections=settings.calendar_max_connections,
+            max_keepalive_connections=settings.calendar_max_keepalive_connections,
+            keepalive_expiry=settings.calendar_keepalive_expiry_seconds,
+            http2=settings.calendar_http2,
+        )
+    return _calendar_client
+
+
+async def close_calendar_client() -> None:
+    """關閉全局 Calendar client（於 app 關閉時呼叫）"""
+    global _calendar_client
+    if _calendar_client is not None:
+        await _calendar_client.aclose()
+        _calendar_client = None
@@ -0,0 +1,310 @@
+"""每位使用者的行事曆事件鏡像：首次完整同步，之後以 syncToken 增量更新
+
+完整同步只涵蓋現在前後的時間窗，並在背景執行（期間的查詢直接問 Google）；
+時間窗內的區間查詢直接由鏡像回答，透過 tools 的寫入會同步更新鏡像（write-through）。
+依使用者數與總記憶體量以 LRU 淘汰，單一使用者事件過多時不建立鏡像，直接查詢 Google。
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Optional
+from zoneinfo import ZoneInfo
+
+import orjson
+
+from ..config import settings
+from .calendar_client import CalendarApiError, CalendarClient, get_calendar_client
+from .metrics import CALENDAR_MIRROR_REQUESTS, REGISTRY
+
+# 完整同步與增量同步共用的查詢參數；時間窗只用於完整同步（syncToken 不可搭配 timeMin / timeMax / orderBy）
+_SYNC_PARAMS = {"singleEvents": True, "maxResults": 2500}
+
+
+def _parse_time(value: str, tz: ZoneInfo) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=tz)
+
+
+def _event_bounds(event: dict[str, Any], tz: ZoneInfo) -> tuple[datetime, datetime]:
+    """事件的開始與結束時間；全天事件以日曆時區的午夜計算"""
+    bounds = []
+    for key in ("start", "end"):
+        value = event.get(key) or {}
+        if "dateTime" in value:
+            bounds.append(_parse_time(value["dateTime"], tz))
+        else:
+            day = date.fromisoformat(value["date"])
+            bounds.append(datetime(day.year, day.month, day.day, tzinfo=tz))
+    return bounds[0], bounds[1]
+
+
+class _Entry:
+    __slots__ = ("start", "end", "event", "size")
+
+    def __init__(self, start: datetime, end: datetime, event: dict[str, Any], size: int):
+        self.start = start
+        self.end = end
+        self.event = event
+        self.size = size
+
+
+class _UserMirror:
+    def __init__(self):
+        self.entries: dict[str, _Entry] = {}
+        self.sync_token: Optional[str] = None
+        self.synced_at = 0.0
+        self.time_zone = ZoneInfo("UTC")
+        # 完整同步涵蓋的時間窗；增量同步傳回的窗外事件不保存
+        self.window_start = datetime.min.replace(tzinfo=timezone.utc)
+        self.window_end = datetime.max.replace(tzinfo=timezone.utc)
+        self.size = 0
+        # 事件過多，不適合鏡像；直到使用者透過 tools 刪除事件前不再嘗試同步
+        self.oversized = False
+        self.building: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()
+
+    def upsert(self, event: dict[str, Any]) -> None:
+        event_id = event["id"]
+        if event.get("status") == "cancelled":
+            self.remove(event_id)
+            return
+        try:
+            start, end = _event_bounds(event, self.time_zone)
+        except (KeyError, ValueError):
+            return
+        self.remove(event_id)
+        if end <= self.window_start or start >= self.window_end:
+            return
+        size = len(orjson.dumps(event))
+        self.entries[event_id] = _Entry(start, end, event, size)
+        self.size += size
+
+    def remove(self, event_id: str) -> None:
+        entry = self.entries.pop(event_id, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.size = 0
+        self.sync_token = None
+
+
+class CalendarMirror:
+    def __init__(
+        self,
+        max_users: int,
+        max_bytes: int,
+        user_max_bytes: int,
+        refresh_seconds: float,
+        window_past: timedelta,
+        window_future: timedelta,
+    ):
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.user_max_bytes = user_max_bytes
+        self.refresh_seconds = refresh_seconds
+        self.window_past = window_past
+        self.window_future = window_future
+        self._users: OrderedDict[str, _UserMirror] = OrderedDict()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(mirror.size for mirror in self._users.values())
+
+    def _mirror(self, user_id: str) -> _UserMirror:
+        mirror = self._users.get(user_id)
+        if mirror is None:
+            mirror = self._users[user_id] = _UserMirror()
+        else:
+            self._users.move_to_end(user_id)
+        return mirror
+
+    def _evict(self) -> None:
+        total = self.total_bytes
+        # 最近使用的一位（剛查詢的使用者）永遠保留
+        while len(self._users) > 1 and (len(self._users) > self.max_users or total > self.max_bytes):
+            _, mirror = self._users.popitem(last=False)
+            total -= mirror.size
+
+    async def _sync(self, client: CalendarClient, access_token: str, mirror: _UserMirror) -> None:
+        """有 syncToken 時增量同步，否則完整同步時間窗內的事件
+
+        增量同步時 syncToken 已失效（410）則清空鏡像，交由下一次查詢在背景重建。
+        """
+        params: dict[str, Any] = dict(_SYNC_PARAMS)
+        if mirror.sync_token is None:
+            CALENDAR_MIRROR_REQUESTS.inc(result="full_sync")
+            mirror.clear()
+            now = datetime.now(timezone.utc)
+            mirror.window_start = now - self.window_past
+            mirror.window_end = now + self.window_future
+            params["timeMin"] = mirror.window_start.isoformat()
+            params["timeMax"] = mirror.window_end.isoformat()
+        else:
+            CALENDAR_MIRROR_REQUESTS.inc(result="refresh")
+            params["syncToken"] = mirror.sync_token
+
+        while True:
+            try:
+                page = await client.list_events(access_token, **params)
+            except CalendarApiError as e:
+                if e.status_code == 410 and "syncToken" in params:
+                    mirror.clear()
+                    return
+                raise
+
+            if page.get("timeZone"):
+                mirror.time_zone = ZoneInfo(page["timeZone"])
+            for event in page.get("items", []):
+                mirror.upsert(event)
+            if mirror.size > self.user_max_bytes:
+                mirror.oversized = True
+                mirror.clear()
+                return
+
+            if page.get("nextPageToken"):
+                params["pageToken"] = page["nextPageToken"]
+                continue
+            mirror.sync_token = page.get("nextSyncToken")
+            mirror.synced_at = time.monotonic()
+            return
+
+    async def _build(self, access_token: str, mirror: _UserMirror) -> None:
+        """背景完整同步；失敗時保持未同步，下一次查詢再重試"""
+        try:
+            async with mirror.lock:
+                await self._sync(get_calendar_client(), access_token, mirror)
+        except Exception as e:
+            print(f"[DEBUG] Calendar mirror full sync failed: {e}")
+            mirror.clear()
+        finally:
+            mirror.building = None
+        self._evict()
+
+    async def list_range(
+        self,
+        user_id: str,
+        access_token: str,
+        time_min: str,
+        time_max: Optional[str],
+        max_results: int,
+        after: Optional[tuple[str, str]] = None,
+    ) -> Optional[list[tuple[dict[str, Any], tuple[str, str]]]]:
+        """回傳與 [time_min, time_max) 重疊的事件與其排序鍵 (開始時間, id)，依排序鍵遞增；
+        指定 after 時只回傳排序鍵大於它的事件（分頁續查）。無法使用鏡像時回傳 None
+
+        尚未同步的使用者在背景開始完整同步，這次查詢回傳 None；
+        區間超出同步的時間窗且窗內事件不足 max_results 筆時也回傳 None。
+        time_min / time_max / after 不是 ISO 8601 格式時拋出 ValueError。
+        """
+        mirror = self._mirror(user_id)
+        # 未帶時區的時間以日曆時區解讀，與事件時間一致
+        tz = mirror.time_zone
+        lower = _parse_time(time_min, tz)
+        upper = _parse_time(time_max, tz) if time_max else None
+        after_key = (_parse_time(after[0], tz), after[1]) if after else None
+
+        if mirror.sync_token is not None:
+            async with mirror.lock:
+                if time.monotonic() - mirror.synced_at > self.refresh_seconds:
+                    await self._sync(get_calendar_client(), access_token, mirror)
+                else:
+                    CALENDAR_MIRROR_REQUESTS.inc(result="hit")
+        if mirror.sync_token is None:
+            # 尚未同步、同步中、syncToken 失效或事件過多
+            if mirror.building is None and not mirror.oversized:
+                mirror.building = asyncio.create_task(self._build(access_token, mirror))
+            CALENDAR_MIRROR_REQUESTS.inc(result="bypass")
+            return None
+        self._evict()
+
+        if lower < mirror.window_start:
+            CALENDAR_MIRROR_REQUESTS.inc(result="bypass")
+            return None
+        matched = [
+            entry
+            for entry in mirror.entries.values()
+            if entry.end > lower
+            and (upper is None or entry.start < upper)
+            and (after_key is None or (entry.start, entry.event["id"]) > after_key)
+        ]
+        # 時間窗之後的事件開始得更晚，窗內已有足夠筆數時結果仍然完整
+        if (upper is None or upper > mirror.window_end) and len(matched) < max_results:
+            CALENDAR_MIRROR_REQUESTS.inc(result="bypass")
+            return None
+        matched.sort(key=lambda entry: (entry.start, entry.event["id"]))
+        return [
+            (entry.event, (entry.start.isoformat(), entry.event["id"]))
+            for entry in matched[:max_results]
+        ]
+
+    def _existing(self, user_id: str) -> Optional[_UserMirror]:
+        mirror = self._users.get(user_id)
+        if mirror is None or mirror.sync_token is None:
+            return None
+        return mirror
+
+    def etag(self, user_id: str, event_id: str) -> Optional[str]:
+        """鏡像中事件的 etag（即使用者最後看到的版本），用於 If-Match"""
+        mirror = self._existing(user_id)
+        entry = mirror.entries.get(event_id) if mirror is not None else None
+        return entry.event.get("etag") if entry is not None else None
+
+    def invalidate(self, user_id: str) -> None:
+        """下次查詢前強制增量同步（例如寫入時發生 412 衝突）"""
+        mirror = self._existing(user_id)
+        if mirror is not None:
+            mirror.synced_at = 0.0
+
+    def upsert(self, user_id: str, event: dict[str, Any]) -> None:
+        """write-through：tools 新增或修改事件後更新鏡像"""
+        mirror = self._existing(user_id)
+        if mirror is None:
+            return
+        if event.get("recurrence"):
+            # 週期性事件會展開成多個 instance，交給下一次增量同步處理
+            mirror.synced_at = 0.0
+            return
+        mirror.upsert(event)
+
+    def remove(self, user_id: str, event_id: str) -> None:
+        """write-through：tools 刪除事件後更新鏡像"""
+        mirror = self._users.get(user_id)
+        if mirror is not None and mirror.oversized:
+            # 事件量可能已降到上限內，下次查詢重新嘗試建立鏡像
+            mirror.oversized = False
+        mirror = self._existing(user_id)
+        if mirror is not None:
+            mirror.remove(event_id)
+            # 刪除週期性事件的 master 時 instance 仍在鏡像中，下次查詢前先增量同步
+            mirror.synced_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+calendar_mirror = CalendarMirror(
+    max_users=settings.calendar_mirror_max_users,
+    max_bytes=settings.calendar_mirror_max_bytes,
+    user_max_bytes=settings.calendar_mirror_user_max_bytes,
+    refresh_seconds=settings.calendar_mirror_refresh_seconds,
+    window_past=timedelta(days=settings.calendar_mirror_window_past_days),
+    window_future=timedelta(days=settings.calendar_mirror_window_future_days),
+)
+
+REGISTRY.gauge(
+    "calendar_mirror",
+    "Mirrored calendar users and approximate bytes",
+    ["stat"],
+    callback=lambda: {
+        ("users",): len(calendar_mirror),
+        ("bytes",): calendar_mirror.total_bytes,
+    },
+)
+
+
+def get_calendar_mirror() -> Optional[CalendarMirror]:
+    """獲取全局 calendar mirror；未啟用時回傳 None"""
+    return calendar_mirror if settings.calendar_mirror_enabled else None
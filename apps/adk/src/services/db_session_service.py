@@ -0,0 +1,354 @@
+"""以 PostgreSQL 儲存的 ADK Session Service"""
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import orjson
+from google.adk.events import Event
+from google.adk.sessions import Session, State
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..db.models import AdkAppState, AdkEvent, AdkSession, AdkUserState
+
+
+def dump_event(event: Event) -> dict[str, Any]:
+    """Event 轉成 JSONB 內容（JSON 模式，bytes 以 base64 編碼）"""
+    return event.model_dump(mode="json", exclude_none=True)
+
+
+def load_event(data: dict[str, Any]) -> Event:
+    """由 JSONB 內容還原 Event；必須以 JSON 模式驗證，inline_data 的 base64 才會解碼回 bytes"""
+    return Event.model_validate_json(orjson.dumps(data))
+
+
+def split_state_delta(
+    state: Optional[dict[str, Any]],
+) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
+    """依前綴拆分 state 為 app、user、session 三層（temp: 不落地）"""
+    app_state: dict[str, Any] = {}
+    user_state: dict[str, Any] = {}
+    session_state: dict[str, Any] = {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+def merge_state(
+    app_state: Optional[dict[str, Any]],
+    user_state: Optional[dict[str, Any]],
+    session_state: Optional[dict[str, Any]],
+) -> dict[str, Any]:
+    """將三層 state 合併為 session 看到的 state"""
+    merged = dict(session_state or {})
+    for key, value in (app_state or {}).items():
+        merged[State.APP_PREFIX + key] = value
+    for key, value in (user_state or {}).items():
+        merged[State.USER_PREFIX + key] = value
+    return merged
+
+
+@dataclass
+class _CachedSession:
+    """快取中的 session events，last_position 為已載入的最後一筆 event"""
+    events: list[Event] = field(default_factory=list)
+    last_position: int = 0
+
+
+class PostgresSessionService(BaseSessionService):
+    """Session 存於 adk_sessions，events 以 append-only 方式寫入 adk_events
+
+    get_session 只查詢 session 列與快取之後新增的 events，
+    讓多個 worker 共用同一份對話狀態，同時避免每次重新載入完整歷史。
+    event 的 position 在 session 列的 row lock 下遞增，commit 順序與 position 一致，
+    因此「position 大於已載入者」不會漏掉晚 commit 的 event（全域 seq 無此保證）。
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        cache_size: int = 1000,
+    ):
+        self.session_factory = session_factory
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, str, str], _CachedSession] = OrderedDict()
+
+    def _cache_put(self, key: tuple[str, str, str], cached: _CachedSession) -> None:
+        self._cache[key] = cached
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _upsert_scoped_state(
+        self,
+        db: AsyncSession,
+        app_name: str,
+        user_id: str,
+        app_delta: dict[str, Any],
+        user_delta: dict[str, Any],
+    ) -> None:
+        """以 JSONB || 合併 app 與 user state"""
+        if app_delta:
+            stmt = insert(AdkAppState).values(app_name=app_name, state=app_delta)
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[AdkAppState.app_name],
+                    set_={
+                        "state": AdkAppState.state.op("||")(stmt.excluded.state),
+                        "updated_at": func.now(),
+                    },
+                )
+            )
+        if user_delta:
+            stmt = insert(AdkUserState).values(
+                app_name=app_name, user_id=user_id, state=user_delta
+            )
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[AdkUserState.app_name, AdkUserState.user_id],
+                    set_={
+                        "state": AdkUserState.state.op("||")(stmt.excluded.state),
+                        "updated_at": func.now(),
+                    },
+                )
+            )
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        app_delta, user_delta, session_state = split_state_delta(state)
+
+        async with self.session_factory() as db:
+            try:
+                async with db.begin():
+                    await self._upsert_scoped_state(
+                        db, app_name, user_id, app_delta, user_delta
+                    )
+                    row = AdkSession(
+                        app_name=app_name,
+                        user_id=user_id,
+                        id=session_id,
+                        state=session_state,
+                    )
+                    db.add(row)
+                    await db.flush()
+                    await db.refresh(row, ["updated_at"])
+                    app_state, user_state = await self._load_scoped_state(
+                        db, app_name, user_id
+                    )
+            except IntegrityError:
+                raise ValueError(f"Session {session_id} already exists")
+
+        self._cache_put((app_name, user_id, session_id), _CachedSession())
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=merge_state(app_state, user_state, session_state),
+            events=[],
+            last_update_time=row.updated_at.timestamp(),
+        )
+
+    async def _load_scoped_state(
+        self, db: AsyncSession, app_name: str, user_id: str
+    ) -> tuple[Optional[dict[str, Any]], Optional[dict[str, Any]]]:
+        app_state = await db.scalar(
+            select(AdkAppState.state).where(AdkAppState.app_name == app_name)
+        )
+        user_state = await db.scalar(
+            select(AdkUserState.state).where(
+                AdkUserState.app_name == app_name, AdkUserState.user_id == user_id
+            )
+        )
+        return app_state, user_state
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        cached = self._cache.get(key) or _CachedSession()
+
+        async with self.session_factory() as db:
+            # 一次取回 session（含 event 數）與 app/user state
+            result = await db.execute(
+                select(AdkSession, AdkAppState.state, AdkUserState.state)
+                .outerjoin(AdkAppState, AdkAppState.app_name == AdkSession.app_name)
+                .outerjoin(
+                    AdkUserState,
+                    (AdkUserState.app_name == AdkSession.app_name)
+                    & (AdkUserState.user_id == AdkSession.user_id),
+                )
+                .where(
+                    AdkSession.app_name == app_name,
+                    AdkSession.user_id == user_id,
+                    AdkSession.id == session_id,
+                )
+            )
+            row = result.first()
+            if row is None:
+                self._cache.pop(key, None)
+                return None
+            session_row, app_state, user_state = row
+
+            # 其他 worker 寫入的新 event 才需要載入
+            if session_row.event_count < cached.last_position:
+                cached = _CachedSession()
+            if session_row.event_count > cached.last_position:
+                new_rows = await db.execute(
+                    select(AdkEvent.position, AdkEvent.data)
+                    .where(
+                        AdkEvent.app_name == app_name,
+                        AdkEvent.user_id == user_id,
+                        AdkEvent.session_id == session_id,
+                        AdkEvent.position > cached.last_position,
+                    )
+                    .order_by(AdkEvent.position)
+                )
+                for position, data in new_rows:
+                    # 並行的 get_session / append_event 可能已經載入同一批 events
+                    if position <= cached.last_position:
+                        continue
+                    cached.events.append(load_event(data))
+                    cached.last_position = position
+
+        self._cache_put(key, cached)
+
+        events = cached.events
+        if config:
+            if config.after_timestamp:
+                events = [e for e in events if e.timestamp >= config.after_timestamp]
+            if config.num_recent_events:
+                events = events[-config.num_recent_events:]
+
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=merge_state(app_state, user_state, session_row.state),
+            events=list(events),
+            last_update_time=session_row.updated_at.timestamp(),
+        )
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        stmt = select(AdkSession).where(AdkSession.app_name == app_name)
+        if user_id is not None:
+            stmt = stmt.where(AdkSession.user_id == user_id)
+
+        async with self.session_factory() as db:
+            rows = (await db.execute(stmt)).scalars().all()
+
+        return ListSessionsResponse(
+            sessions=[
+                Session(
+                    id=row.id,
+                    app_name=row.app_name,
+                    user_id=row.user_id,
+                    state=row.state,
+                    events=[],
+                    last_update_time=row.updated_at.timestamp(),
+                )
+                for row in rows
+            ]
+        )
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        self._cache.pop((app_name, user_id, session_id), None)
+        async with self.session_factory() as db, db.begin():
+            await db.execute(
+                delete(AdkSession).where(
+                    AdkSession.app_name == app_name,
+                    AdkSession.user_id == user_id,
+                    AdkSession.id == session_id,
+                )
+            )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        event = self._trim_temp_delta_state(event)
+        state_delta = event.actions.state_delta if event.actions else None
+        app_delta, user_delta, session_delta = split_state_delta(state_delta)
+
+        # 只新增一列 event，session state 以 JSONB || 合併，不重寫整個 session；
+        # 先更新 session 列取得 row lock 與 position，同一 session 的 append 依序 commit
+        async with self.session_factory() as db, db.begin():
+            values: dict[str, Any] = {
+                "event_count": AdkSession.event_count + 1,
+                "updated_at": func.now(),
+            }
+            if session_delta:
+                values["state"] = AdkSession.state.op("||")(session_delta)
+            position = await db.scalar(
+                update(AdkSession)
+                .where(
+                    AdkSession.app_name == session.app_name,
+                    AdkSession.user_id == session.user_id,
+                    AdkSession.id == session.id,
+                )
+                .values(**values)
+                .returning(AdkSession.event_count)
+            )
+            if position is None:
+                raise ValueError(f"Session {session.id} not found")
+            await db.execute(
+                insert(AdkEvent).values(
+                    app_name=session.app_name,
+                    user_id=session.user_id,
+                    session_id=session.id,
+                    position=position,
+                    event_id=event.id,
+                    invocation_id=event.invocation_id,
+                    author=event.author,
+                    timestamp=event.timestamp,
+                    data=dump_event(event),
+                )
+            )
+            await self._upsert_scoped_state(
+                db, session.app_name, session.user_id, app_delta, user_delta
+            )
+
+        # 自己寫入的 event 直接加入快取；快取落後（中間有其他 worker 的 event）時交給 get_session 補齊
+        cached = self._cache.get((session.app_name, session.user_id, session.id))
+        if cached is not None and cached.last_position == position - 1:
+            cached.events.append(event)
+            cached.last_position = position
+
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        return event
+
+    def stats(self) -> dict[str, int]:
+        """本地快取持有的 session 與 event 數量"""
+        return {
+            "sessions": len(self._cache),
+            "events": sum(len(cached.events) for cached in self._cache.values()),
+        }
@@ -0,0 +1,170 @@
+"""背景批次寫入對話訊息（write-behind）"""
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..db.models import Conversation, Message
+from ..db.session import AsyncSessionLocal
+
+
+@dataclass
+class PendingMessage:
+    """等待寫入的訊息"""
+    conversation_id: uuid.UUID
+    user_id: uuid.UUID
+    role: str
+    content: str
+    attachments: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class MessageWriter:
+    """將完成的對話回合交給背景 task，批次寫入 messages 並更新對話時間
+
+    每次 flush 在同一個 transaction 內 bulk insert 所有訊息，
+    並更新相關 Conversation.updated_at，寫入不佔用 SSE 串流的執行路徑。
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        max_queue_size: int = 10000,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # None 為停止訊號（sentinel）
+        self._queue: asyncio.Queue[Optional[PendingMessage]] = asyncio.Queue(max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def submit(
+        self,
+        conversation_id: Optional[str],
+        user_id: Optional[uuid.UUID],
+        role: str,
+        content: str,
+        attachments: Optional[str] = None,
+    ) -> bool:
+        """加入待寫入佇列，不等待資料庫；conversation_id 無效或佇列已滿時回傳 False"""
+        if not conversation_id or user_id is None:
+            return False
+        try:
+            conv_uuid = uuid.UUID(conversation_id)
+        except ValueError:
+            return False
+
+        try:
+            self._queue.put_nowait(
+                PendingMessage(
+                    conversation_id=conv_uuid,
+                    user_id=user_id,
+                    role=role,
+                    content=content,
+                    attachments=attachments,
+                )
+            )
+        except asyncio.QueueFull:
+            print(f"[DEBUG] Message queue full, dropping {role} message")
+            return False
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """通知背景 task 寫完手上與佇列中的訊息後結束（不取消進行中的 flush）"""
+        if self._task is not None:
+            self._stopping.set()
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+        # sentinel 之後才送入的訊息
+        while not self._queue.empty():
+            await self._flush(self._drain()[0])
+
+    def _drain(
+        self, first: Optional[PendingMessage] = None
+    ) -> tuple[list[PendingMessage], bool]:
+        """取出一批訊息；第二個值表示是否遇到停止訊號"""
+        batch = [first] if first is not None else []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            message = self._queue.get_nowait()
+            if message is None:
+                return batch, True
+            batch.append(message)
+        return batch, False
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            # 不足一批時等待一小段時間累積更多訊息再寫入，收到停止通知則立即寫入
+            if self._queue.qsize() < self.batch_size - 1 and not self._stopping.is_set():
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch, stopping = self._drain(first)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[PendingMessage]) -> None:
+        if not batch:
+            return
+
+        try:
+            async with self.session_factory() as db, db.begin():
+                # 略過不存在或不屬於該使用者的對話，避免單筆 FK 錯誤讓整批失敗
+                conversation_ids = {m.conversation_id for m in batch}
+                result = await db.execute(
+                    select(Conversation.id, Conversation.user_id).where(
+                        Conversation.id.in_(conversation_ids)
+                    )
+                )
+                owners = dict(result.all())
+                rows = [
+                    {
+                        "id": uuid.uuid4(),
+                        "conversation_id": m.conversation_id,
+                        "role": m.role,
+                        "content": m.content,
+                        "attachments": m.attachments,
+                        "created_at": m.created_at,
+                    }
+                    for m in batch
+                    if owners.get(m.conversation_id) == m.user_id
+                ]
+                if not rows:
+                    return
+
+                await db.execute(insert(Message), rows)
+                await db.execute(
+                    update(Conversation)
+                    .where(Conversation.id.in_({row["conversation_id"] for row in rows}))
+                    .values(updated_at=func.now())
+                )
+            print(f"[DEBUG] Flushed {len(rows)} messages")
+        except Exception as e:
+            print(f"[DEBUG] Failed to flush {len(batch)} messages: {e}")
+
+
+_message_writer: Optional[MessageWriter] = None
+
+
+def get_message_writer() -> MessageWriter:
+    """獲取全局 message writer"""
+    global _message_writer
+    if _message_writer is None:
+        _message_writer = MessageWriter(AsyncSessionLocal)
+    return _message_writer
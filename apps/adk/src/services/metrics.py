@@ -0,0 +1,312 @@
+"""輕量 Prometheus 格式指標（Counter / Gauge / Histogram）
+
+記錄只做 dict 查找與整數累加，可常駐於 production 的熱路徑。
+"""
+import functools
+import inspect
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Sequence
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _escape_label(value: str) -> str:
+    """依 exposition format 跳脫 label 值中的 \\、" 與換行"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._samples(),
+        ]
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """此指標的 sample 行"""
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in list(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, *args, callback: Optional[Callable[[], dict]] = None, **kwargs):
+        """callback 回傳 {label 值 tuple: 數值}，於 scrape 時才計算"""
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> list[str]:
+        values = dict(self._values)
+        if self._callback is not None:
+            try:
+                values.update(self._callback())
+            except Exception as e:
+                print(f"[DEBUG] Gauge {self.name} callback failed: {e}")
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._children: dict[tuple[str, ...], _HistogramChild] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = _HistogramChild(len(self.buckets))
+            child.counts[index] += 1
+            child.sum += value
+            child.count += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """量測區塊耗時（秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {child.sum!r}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], dict]] = None,
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, callback=callback))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    def render(self) -> str:
+        """輸出 Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def timed(histogram: Histogram, **labels: str):
+    """量測函式耗時的 decorator（支援 sync 與 async 函式）"""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Chat 熱路徑
+CHAT_USER_LOOKUP_SECONDS = REGISTRY.histogram(
+    "chat_user_lookup_seconds", "Time to resolve the chat user from the database"
+)
+CHAT_SESSION_SECONDS = REGISTRY.histogram(
+    "chat_session_seconds", "Time to get or create the ADK session", ["operation"]
+)
+CHAT_TTFT_SECONDS = REGISTRY.histogram(
+    "chat_time_to_first_token_seconds", "Time from request to the first text delta", ["route"]
+)
+CHAT_STREAM_SECONDS = REGISTRY.histogram(
+    "chat_stream_duration_seconds", "Total duration of a chat SSE stream"
+)
+CHAT_EVENTS_PER_TURN = REGISTRY.histogram(
+    "chat_events_per_turn",
+    "Number of ADK events produced per chat turn",
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+CHAT_STREAMS_IN_FLIGHT = REGISTRY.gauge(
+    "chat_streams_in_flight", "Number of chat SSE streams currently open"
+)
+CHAT_RUNS_CANCELLED = REGISTRY.counter(
+    "chat_runs_cancelled_total", "Agent runs cancelled before completion", ["reason"]
+)
+CHAT_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "chat_queue_wait_seconds", "Time a chat request waited for an execution slot"
+)
+CHAT_ADMISSION_REJECTED = REGISTRY.counter(
+    "chat_admission_rejected_total", "Chat requests rejected by admission control", ["reason"]
+)
+CHAT_IDEMPOTENT_REPLAYS = REGISTRY.counter(
+    "chat_idempotent_replays_total",
+    "Duplicate chat submissions served from an existing stream",
+    ["state"],
+)
+CHAT_STREAM_RESUMES = REGISTRY.counter(
+    "chat_stream_resumes_total", "Chat SSE streams resumed with Last-Event-ID"
+)
+CHAT_ROUTE_DECISIONS = REGISTRY.counter(
+    "chat_route_decisions_total", "Agent each chat turn was started on", ["route"]
+)
+CHAT_ROOT_HOP_SECONDS = REGISTRY.histogram(
+    "chat_root_hop_seconds",
+    "Time from run start until root_agent handed the turn to calendar_agent",
+)
+CHAT_ROUTER_SAVED_SECONDS = REGISTRY.counter(
+    "chat_router_saved_seconds_total",
+    "Estimated latency saved by routing straight to calendar_agent",
+)
+CHAT_ANSWER_CACHE_LOOKUPS = REGISTRY.counter(
+    "chat_answer_cache_lookups_total", "Answer cache lookups by result (hit, miss)", ["result"]
+)
+
+# Prompt 大小（對話歷史壓縮前後）
+PROMPT_TOKENS_ESTIMATE = REGISTRY.histogram(
+    "llm_prompt_tokens_estimate",
+    "Estimated prompt tokens per LLM call before and after history compaction",
+    ["agent", "stage"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000),
+)
+PROMPT_CONTENTS = REGISTRY.histogram(
+    "llm_prompt_contents",
+    "Number of contents per LLM call before and after history compaction",
+    ["agent", "stage"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+HISTORY_COMPACTIONS = REGISTRY.counter(
+    "history_compactions_total", "Times older history was folded into a summary", ["agent"]
+)
+
+# Tools 與 OAuth
+TOOL_SECONDS = REGISTRY.histogram(
+    "tool_duration_seconds", "Tool execution latency", ["tool"]
+)
+CALENDAR_MIRROR_REQUESTS = REGISTRY.counter(
+    "calendar_mirror_requests_total",
+    "Calendar range queries by mirror outcome (hit, refresh, full_sync, bypass)",
+    ["result"],
+)
+CALENDAR_TOKEN_LOOKUP_SECONDS = REGISTRY.histogram(
+    "calendar_token_lookup_seconds",
+    "Time spent in before_calendar_tool resolving the access token",
+)
+OAUTH_REFRESH_SECONDS = REGISTRY.histogram(
+    "oauth_refresh_seconds", "Google OAuth token refresh latency", ["result"]
+)
@@ -0,0 +1,39 @@
+"""進行中的 agent run 登記，用於依 message id 取消"""
+from typing import Callable, Optional
+
+
+class RunRegistry:
+    """message_id -> (user_id, cancel callback)；匿名 run 的 user_id 為 None"""
+
+    def __init__(self):
+        self._runs: dict[str, tuple[Optional[str], Callable[[], None]]] = {}
+
+    def register(
+        self, message_id: str, user_id: Optional[str], cancel: Callable[[], None]
+    ) -> None:
+        self._runs[message_id] = (user_id, cancel)
+
+    def unregister(self, message_id: str) -> None:
+        self._runs.pop(message_id, None)
+
+    def cancel(self, message_id: str, user_id: Optional[str] = None) -> bool:
+        """取消指定 message 的 agent run；user_id 必須與發起者相同（匿名 run 兩者皆為 None）"""
+        run = self._runs.get(message_id)
+        if run is None:
+            return False
+        owner, cancel = run
+        if owner != user_id:
+            return False
+        cancel()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+
+run_registry = RunRegistry()
+
+
+def get_run_registry() -> RunRegistry:
+    """獲取全局 run registry"""
+    return run_registry
@@ -0,0 +1,72 @@
+"""全局 Runner 管理"""
+from typing import Optional
+
+from google.adk import Runner
+from google.adk.agents import BaseAgent, LlmAgent
+
+from ..agents.calendar_agent import calendar_agent
+from ..agents.root_agent import root_agent
+from ..constants import APP_NAME
+from .session_service import get_session_service
+
+# 每個 process 只建立一次 Runner，避免每個請求重建 agent tree 與 model client
+_runner: Optional[Runner] = None
+# 直接從 sub-agent 開始執行的 Runner（fast-path router 使用），共用同一個 session service
+_agent_runners: dict[str, Runner] = {}
+
+
+def warm_agent_tree(agent: BaseAgent) -> None:
+    """預先解析各 agent 的 model 並建立 API client"""
+    if isinstance(agent, LlmAgent) and isinstance(agent.model, str):
+        try:
+            # model 為字串時，每次 LLM 呼叫都會透過 LLMRegistry 建立新的實例
+            # 這裡解析一次並寫回 agent，讓所有請求共用同一個 model client
+            model = agent.canonical_model
+            # Gemini 的 api_client 為 cached_property，第一次存取時才建立
+            if hasattr(model, "api_client"):
+                model.api_client
+            agent.model = model
+        except Exception as e:
+            print(f"[DEBUG] Failed to warm model for {agent.name}: {e}")
+
+    for sub_agent in agent.sub_agents:
+        warm_agent_tree(sub_agent)
+
+
+def init_runner() -> Runner:
+    """建立全局 Runner（於 app 啟動時呼叫）"""
+    global _runner
+    if _runner is None:
+        warm_agent_tree(root_agent)
+        _runner = Runner(
+            app_name=APP_NAME,
+            agent=root_agent,
+            session_service=get_session_service(),
+        )
+        # sub-agent 仍掛在 root_agent 之下，transfer 回 root 時可在整個 agent tree 中找到目標
+        _agent_runners[calendar_agent.name] = Runner(
+            app_name=APP_NAME,
+            agent=calendar_agent,
+            session_service=get_session_service(),
+        )
+        print("[DEBUG] Runner initialized")
+    return _runner
+
+
+def get_runner(agent_name: Optional[str] = None) -> Runner:
+    """獲取全局 Runner；指定 agent_name 時回傳直接從該 agent 開始執行的 Runner"""
+    runner = _runner or init_runner()
+    if agent_name is None:
+        return runner
+    return _agent_runners.get(agent_name, runner)
+
+
+async def close_runner() -> None:
+    """關閉全局 Runner（於 app 關閉時呼叫）"""
+    global _runner
+    if _runner is not None:
+        await _runner.close()
+        _runner = None
+    for runner in _agent_runners.values():
+        await runner.close()
+    _agent_runners.clear()
@@ -1,11 +1,180 @@
 """全局 Session Service 管理"""
-from google.adk.sessions import InMemorySessionService
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+)
+
+from ..config import settings
+from ..db.session import AsyncSessionLocal
+from .db_session_service import PostgresSessionService
+
+
+@dataclass
+class _SessionEntry:
+    """單一 session 的使用紀錄"""
+    last_access: float
+    events: int = 0
+    approx_bytes: int = 0
+
+
+class BoundedInMemorySessionService(InMemorySessionService):
+    """具備 LRU、閒置 TTL 與記憶體上限的 InMemorySessionService"""
+
+    def __init__(
+        self,
+        max_sessions: int,
+        idle_ttl_seconds: float,
+        max_bytes: int,
+    ):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_bytes = max_bytes
+        # key: (app_name, user_id, session_id)，依最近存取時間排序（最舊在前）
+        self._entries: OrderedDict[tuple[str, str, str], _SessionEntry] = OrderedDict()
+        self._total_events = 0
+        self._total_bytes = 0
+        self._evictions = 0
+
+    def _touch(self, key: tuple[str, str, str]) -> _SessionEntry:
+        """更新 session 的存取時間並移到 LRU 尾端"""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _SessionEntry(last_access=time.monotonic())
+            self._entries[key] = entry
+        else:
+            entry.last_access = time.monotonic()
+            self._entries.move_to_end(key)
+        return entry
+
+    def _forget(self, key: tuple[str, str, str]) -> None:
+        """移除 session 的使用紀錄"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_events -= entry.events
+            self._total_bytes -= entry.approx_bytes
+
+    def _is_expired(self, entry: _SessionEntry, now: float) -> bool:
+        return now - entry.last_access > self.idle_ttl_seconds
+
+    async def _evict(self) -> None:
+        """淘汰閒置過久的 session，再依 LRU 淘汰直到符合數量與記憶體上限"""
+        now = time.monotonic()
+        # 保留最近使用的 session（通常是正在執行中的對話）
+        while len(self._entries) > 1:
+            key, entry = next(iter(self._entries.items()))
+            over_budget = (
+                len(self._entries) > self.max_sessions
+                or self._total_bytes > self.max_bytes
+            )
+            if not over_budget and not self._is_expired(entry, now):
+                break
+            await self._evict_key(key)
+
+    async def _evict_key(self, key: tuple[str, str, str]) -> None:
+        app_name, user_id, session_id = key
+        self._forget(key)
+        self._evictions += 1
+        await super().delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await super().create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self._touch((app_name, user_id, session.id))
+        await self._evict()
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        entry = self._entries.get(key)
+        if entry is not None and self._is_expired(entry, time.monotonic()):
+            await self._evict_key(key)
+            return None
+
+        session = await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None:
+            self._touch(key)
+        return session
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        self._forget((app_name, user_id, session_id))
+        await super().delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+
+        key = (session.app_name, session.user_id, session.id)
+        if key in self._entries:
+            entry = self._touch(key)
+            size = len(event.model_dump_json(exclude_none=True))
+            entry.events += 1
+            entry.approx_bytes += size
+            self._total_events += 1
+            self._total_bytes += size
+            await self._evict()
+        return event
+
+    def stats(self) -> dict[str, int]:
+        """目前持有的 session、event 數量與估計位元組"""
+        return {
+            "sessions": len(self._entries),
+            "events": self._total_events,
+            "approx_bytes": self._total_bytes,
+            "evictions": self._evictions,
+        }
+
+
+def create_session_service() -> BaseSessionService:
+    """依 SESSION_BACKEND 建立 session service（memory 或 database）"""
+    if settings.session_backend == "database":
+        return PostgresSessionService(
+            session_factory=AsyncSessionLocal,
+            cache_size=settings.session_cache_size,
+        )
+    return BoundedInMemorySessionService(
+        max_sessions=settings.session_max_count,
+        idle_ttl_seconds=settings.session_idle_ttl_seconds,
+        max_bytes=settings.session_max_bytes,
+    )
+
 
 # 創建全局的 session service 實例
 # 這樣可以在多個請求之間保持對話狀態，避免每次傳遞完整歷史
-global_session_service = InMemorySessionService()
+global_session_service = create_session_service()
 
 
-def get_session_service() -> InMemorySessionService:
+def get_session_service() -> BaseSessionService:
     """獲取全局 session service"""
     return global_session_service
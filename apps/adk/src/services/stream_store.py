@@ -0,0 +1,258 @@
+"""SSE 串流紀錄：每則訊息的 frames 保存在有上限的緩衝區，供斷線續傳與重送重播"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from ..config import settings
+
+
+class StreamExpired(Exception):
+    """要求的 frame 已被移出緩衝區，無法從該位置續傳"""
+
+
+class StreamRecord:
+    """單一 agent run 輸出的 SSE frames，可被多個 client 同時跟隨
+
+    frame 依產生順序編號（SSE id），緩衝區超過 max_bytes 時丟棄最舊的 frame。
+    所有 client 離開超過 grace_seconds 後取消背景 task。
+    """
+
+    def __init__(
+        self,
+        key: str,
+        owner: Optional[str] = None,
+        max_bytes: int = 0,
+        grace_seconds: float = 0.0,
+    ):
+        self.key = key
+        self.owner = owner
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        self.frames: list[bytes] = []
+        # frames[0] 的編號
+        self.base = 0
+        self.size = 0
+        self.done = False
+        self.completed = False
+        self.finished_at: Optional[float] = None
+        self.followers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._abandon_timer: Optional[asyncio.TimerHandle] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def failed(self) -> bool:
+        """已結束但未正常完成（被取消或發生錯誤）"""
+        return self.done and not self.completed
+
+    @property
+    def next_id(self) -> int:
+        return self.base + len(self.frames)
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def append(self, frame: bytes) -> None:
+        self.frames.append(frame)
+        self.size += len(frame)
+        if self.max_bytes and self.size > self.max_bytes:
+            drop = 0
+            while self.size > self.max_bytes and drop < len(self.frames) - 1:
+                self.size -= len(self.frames[drop])
+                drop += 1
+            del self.frames[:drop]
+            self.base += drop
+        self._notify()
+
+    def finish(self, completed: bool) -> None:
+        self.done = True
+        self.completed = completed
+        self.finished_at = time.monotonic()
+        self._cancel_abandon_timer()
+        self._notify()
+
+    def run(self, frames: AsyncIterator[bytes], finish_frame: Optional[bytes] = None) -> None:
+        """在背景 task 中消耗 frames 並寫入紀錄，不受單一 client 連線影響
+
+        指定 finish_frame 時，最後一個 frame 必須是它才算正常完成。
+        """
+        self.task = asyncio.create_task(self._record(frames, finish_frame))
+        if self.followers == 0:
+            self._arm_abandon_timer()
+
+    async def _record(self, frames: AsyncIterator[bytes], finish_frame: Optional[bytes]) -> None:
+        completed = False
+        try:
+            async for frame in frames:
+                self.append(frame)
+            completed = finish_frame is None or (
+                bool(self.frames) and self.frames[-1] == finish_frame
+            )
+        finally:
+            self.finish(completed=completed)
+
+    def _arm_abandon_timer(self) -> None:
+        self._cancel_abandon_timer()
+        if self.task is None or self.done:
+            return
+        self._abandon_timer = asyncio.get_running_loop().call_later(
+            self.grace_seconds, self._abandon
+        )
+
+    def _cancel_abandon_timer(self) -> None:
+        if self._abandon_timer is not None:
+            self._abandon_timer.cancel()
+            self._abandon_timer = None
+
+    def _abandon(self) -> None:
+        self._abandon_timer = None
+        if self.followers == 0 and self.task is not None and not self.task.done():
+            print(f"[DEBUG] No client resumed {self.key}, cancelling run")
+            self.task.cancel()
+
+    def frame_with_id(self, index: int) -> bytes:
+        return b"id: %d\n" % index + self.frames[index - self.base]
+
+    async def follow(
+        self,
+        start: int = 0,
+        heartbeat_seconds: Optional[float] = None,
+        heartbeat_frame: bytes = b"",
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> AsyncIterator[bytes]:
+        """從編號 start 的 frame 開始輸出（含 SSE id），直到串流結束"""
+        if start < self.base:
+            raise StreamExpired(self.key)
+
+        self.followers += 1
+        self._cancel_abandon_timer()
+        try:
+            index = start
+            while True:
+                if index < self.base:
+                    # client 讀取太慢，未送出的 frame 已被丟棄
+                    return
+                while index < self.next_id:
+                    yield self.frame_with_id(index)
+                    index += 1
+                if self.done:
+                    return
+
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    if is_disconnected is not None and await is_disconnected():
+                        return
+                    yield heartbeat_frame
+        finally:
+            self.followers -= 1
+            if self.followers == 0:
+                self._arm_abandon_timer()
+
+
+class StreamStore:
+    """以 message id 保存 StreamRecord，依筆數、位元組與 TTL 淘汰已結束的紀錄
+
+    alias（例如 idempotency key）指向同一筆紀錄，隨紀錄一起淘汰。
+    """
+
+    def __init__(
+        self,
+        max_records: int,
+        max_bytes: int,
+        ttl_seconds: float,
+        record_max_bytes: int = 0,
+        grace_seconds: float = 0.0,
+    ):
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.record_max_bytes = record_max_bytes
+        self.grace_seconds = grace_seconds
+        self._records: OrderedDict[str, StreamRecord] = OrderedDict()
+        self._aliases: dict[str, str] = {}
+        self._record_aliases: dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[StreamRecord]:
+        self._evict()
+        record = self._records.get(key)
+        if record is not None:
+            self._records.move_to_end(key)
+        return record
+
+    def get_by_alias(self, alias: str) -> Optional[StreamRecord]:
+        key = self._aliases.get(alias)
+        return self.get(key) if key is not None else None
+
+    def create(
+        self, key: str, owner: Optional[str] = None, alias: Optional[str] = None
+    ) -> StreamRecord:
+        record = StreamRecord(
+            key,
+            owner=owner,
+            max_bytes=self.record_max_bytes,
+            grace_seconds=self.grace_seconds,
+        )
+        self._records[key] = record
+        self._records.move_to_end(key)
+        if alias is not None:
+            # 失敗的舊紀錄不再透過 alias 取得
+            self._aliases[alias] = key
+            self._record_aliases[key] = alias
+        self._evict()
+        return record
+
+    def _remove(self, key: str) -> None:
+        del self._records[key]
+        alias = self._record_aliases.pop(key, None)
+        if alias is not None and self._aliases.get(alias) == key:
+            del self._aliases[alias]
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        total_bytes = sum(record.size for record in self._records.values())
+        for key, record in list(self._records.items()):
+            # 進行中的串流不淘汰
+            if not record.done:
+                continue
+            expired = now - record.finished_at > self.ttl_seconds
+            over_budget = (
+                len(self._records) > self.max_records or total_bytes > self.max_bytes
+            )
+            if expired or over_budget:
+                self._remove(key)
+                total_bytes -= record.size
+
+    async def shutdown(self, timeout: float) -> None:
+        """等待進行中的 agent run 結束（逾時則取消），讓它們送出的訊息能在 writer 停止前寫入"""
+        tasks = [
+            record.task
+            for record in self._records.values()
+            if record.task is not None and not record.task.done()
+        ]
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+stream_store = StreamStore(
+    max_records=settings.stream_cache_max_records,
+    max_bytes=settings.stream_cache_max_bytes,
+    ttl_seconds=settings.stream_cache_ttl_seconds,
+    record_max_bytes=settings.stream_record_max_bytes,
+    grace_seconds=settings.stream_resume_grace_seconds,
+)
+
+
+def get_stream_store() -> StreamStore:
+    """獲取全局 stream store"""
+    return stream_store
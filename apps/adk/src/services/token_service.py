@@ -1,30 +1,36 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import time
 import uuid
 import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db.models import UserToken
 from ..config import settings
+from .metrics import OAUTH_REFRESH_SECONDS
 
 
 class TokenService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
+    async def _get_token(self, user_uuid: uuid.UUID, provider: str) -> Optional[UserToken]:
+        """查詢指定 provider 的 token"""
+        result = await self.db.execute(
+            select(UserToken).where(
+                UserToken.user_id == user_uuid,
+                UserToken.provider == provider,
+            )
+        )
+        return result.scalars().first()
+
     async def get_valid_token(
         self, user_id: str, provider: str = "google_calendar"
     ) -> Optional[str]:
         """取得有效的 access_token，過期自動刷新"""
         user_uuid = uuid.UUID(user_id)
-        token = (
-            self.db.query(UserToken)
-            .filter(
-                UserToken.user_id == user_uuid,
-                UserToken.provider == provider,
-            )
-            .first()
-        )
+        token = await self._get_token(user_uuid, provider)
 
         if not token:
             return None
@@ -45,10 +51,12 @@ class TokenService:
         if not user_token.refresh_token:
             return None
 
+        started_at = time.perf_counter()
+        result = "error"
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(
-                    "https://oauth2.googleapis.com/token",
+                    settings.google_oauth_token_url,
                     data={
                         "client_id": settings.google_client_id,
                         "client_secret": settings.google_client_secret,
@@ -58,6 +66,7 @@ class TokenService:
                 )
 
                 if response.status_code != 200:
+                    result = "rejected"
                     return None
 
                 data = response.json()
@@ -72,13 +81,16 @@ class TokenService:
                 if "refresh_token" in data:
                     user_token.refresh_token = data["refresh_token"]
 
-                self.db.commit()
+                await self.db.commit()
 
+                result = "success"
                 return user_token.access_token
 
         except Exception as e:
             print(f"Error refreshing token: {e}")
             return None
+        finally:
+            OAUTH_REFRESH_SECONDS.observe(time.perf_counter() - started_at, result=result)
 
     async def save_tokens(
         self,
@@ -97,14 +109,7 @@ class TokenService:
             expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
 
         # 檢查是否已存在
-        existing = (
-            self.db.query(UserToken)
-            .filter(
-                UserToken.user_id == user_uuid,
-                UserToken.provider == provider,
-            )
-            .first()
-        )
+        existing = await self._get_token(user_uuid, provider)
 
         if existing:
             existing.access_token = access_token
@@ -114,7 +119,7 @@ class TokenService:
                 existing.expires_at = expires_at
             if scopes:
                 existing.scopes = scopes
-            self.db.commit()
+            await self.db.commit()
             return existing
         else:
             new_token = UserToken(
@@ -126,36 +131,22 @@ class TokenService:
                 scopes=scopes,
             )
             self.db.add(new_token)
-            self.db.commit()
+            await self.db.commit()
             return new_token
 
     async def revoke_token(self, user_id: str, provider: str = "google_calendar"):
         """撤銷授權"""
         user_uuid = uuid.UUID(user_id)
-        token = (
-            self.db.query(UserToken)
-            .filter(
-                UserToken.user_id == user_uuid,
-                UserToken.provider == provider,
-            )
-            .first()
-        )
+        token = await self._get_token(user_uuid, provider)
 
         if token:
-            self.db.delete(token)
-            self.db.commit()
+            await self.db.delete(token)
+            await self.db.commit()
 
-    def has_valid_token(self, user_id: str, provider: str = "google_calendar") -> bool:
+    async def has_valid_token(self, user_id: str, provider: str = "google_calendar") -> bool:
         """檢查用戶是否已授權"""
         user_uuid = uuid.UUID(user_id)
-        token = (
-            self.db.query(UserToken)
-            .filter(
-                UserToken.user_id == user_uuid,
-                UserToken.provider == provider,
-            )
-            .first()
-        )
+        token = await self._get_token(user_uuid, provider)
 
         if not token:
             return False
@@ -1,21 +1,176 @@
+import base64
+from contextlib import aclosing
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from typing import Optional, List, Dict, Any, AsyncIterator
 
+import orjson
+from google.adk.tools.tool_context import ToolContext
+from pydantic import BaseModel, ValidationError
 
-def get_calendar_service(access_token: str):
-    """建立 Google Calendar 服務"""
-    credentials = Credentials(token=access_token)
-    return build("calendar", "v3", credentials=credentials)
+from ..config import settings
+from ..services.calendar_client import CalendarApiError, get_calendar_client
+from ..services.calendar_mirror import get_calendar_mirror
+from ..services.metrics import TOOL_SECONDS, timed
 
 
-def list_calendar_events(
+def _event_body(
+    summary: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+    description: Optional[str],
+    location: Optional[str],
+    timezone: str,
+    patch: bool = False,
+) -> Dict[str, Any]:
+    """由 tool 參數組出 Calendar event body（只包含有提供的欄位）
+
+    PATCH 會合併巢狀物件，start / end 需明確清除 date，否則全天事件會同時帶有 date 與 dateTime。
+    """
+    event: Dict[str, Any] = {}
+    if summary is not None:
+        event["summary"] = summary
+    for key, value in (("start", start), ("end", end)):
+        if value is not None:
+            event[key] = {"dateTime": value, "timeZone": timezone}
+            if patch:
+                event[key]["date"] = None
+    if description is not None:
+        event["description"] = description
+    if location is not None:
+        event["location"] = location
+    return event
+
+
+def _mirror_upsert(tool_context: Optional[ToolContext], event: Dict[str, Any]) -> None:
+    """寫入成功後同步更新該使用者的事件鏡像"""
+    mirror = get_calendar_mirror()
+    if mirror is not None and tool_context is not None:
+        mirror.upsert(tool_context.user_id, event)
+
+
+def _known_etag(tool_context: Optional[ToolContext], event_id: str) -> Optional[str]:
+    """使用者最後看到的事件版本（來自事件鏡像），用於 If-Match"""
+    mirror = get_calendar_mirror()
+    if mirror is None or tool_context is None:
+        return None
+    return mirror.etag(tool_context.user_id, event_id)
+
+
+def _conflict(tool_context: Optional[ToolContext]) -> Dict[str, Any]:
+    """If-Match 不符（412）：事件在查詢後已被修改"""
+    mirror = get_calendar_mirror()
+    if mirror is not None and tool_context is not None:
+        mirror.invalidate(tool_context.user_id)
+    return {
+        "success": False,
+        "conflict": True,
+        "error": "事件在查詢後已被修改，請重新查詢並向使用者確認後再修改",
+    }
+
+
+def need_auth_result(user_id: Optional[str]) -> Dict[str, Any]:
+    """使用者尚未授權或授權已失效：回傳授權連結給 agent"""
+    return {
+        "success": False,
+        "error": "您尚未授權 Google Calendar 存取權限",
+        "need_auth": True,
+        "user_id": user_id,
+        "auth_url": f"{settings.backend_url}/auth/google/calendar?user_id={user_id}",
+    }
+
+
+def _api_failure(error: CalendarApiError, tool_context: Optional[ToolContext]) -> Dict[str, Any]:
+    """Calendar API 錯誤轉成 tool 結果；401 代表 token 無效，需重新授權"""
+    if error.status_code == 401:
+        return need_auth_result(tool_context.user_id if tool_context is not None else None)
+    return {"success": False, "error": str(error)}
+
+
+def _encode_cursor(cursor: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(cursor)).decode()
+
+
+def _decode_cursor(page_token: Optional[str]) -> Dict[str, Any]:
+    """還原 next_page_token；格式不正確時拋出 ValueError"""
+    if not page_token:
+        return {}
+    cursor = orjson.loads(base64.urlsafe_b64decode(page_token.encode()))
+    if not isinstance(cursor, dict):
+        raise ValueError("invalid page_token")
+    return cursor
+
+
+async def _iter_events(
+    access_token: str,
+    time_min: str,
+    time_max: Optional[str],
+    limit: int,
+    cursor: Dict[str, Any],
+    tool_context: Optional[ToolContext],
+) -> AsyncIterator[tuple[Dict[str, Any], Dict[str, Any]]]:
+    """依開始時間逐筆產生區間內的事件，以及從該事件開始續查所需的 cursor
+
+    優先使用事件鏡像（cursor 為前一筆的 (開始時間, id)），否則逐頁向 Google 查詢
+    （cursor 為該頁的 pageToken 與頁內位置，續查時只需重新取得一頁）。
+    """
+    mirror = get_calendar_mirror()
+    if (
+        mirror is not None
+        and tool_context is not None
+        and cursor.get("source", "mirror") == "mirror"
+    ):
+        after = cursor.get("after")
+        events = await mirror.list_range(
+            tool_context.user_id,
+            access_token,
+            time_min,
+            time_max,
+            limit,
+            after=tuple(after) if after else None,
+        )
+        if events is not None:
+            for event, key in events:
+                yield event, {"source": "mirror", "after": after}
+                after = list(key)
+            return
+        # 鏡像暫時無法使用時改由 Google 從頭查詢（可能與前一頁重複）
+
+    client = get_calendar_client()
+    google_cursor = cursor if cursor.get("source") == "google" else {}
+    page_size = google_cursor.get("size") or min(limit, 250)
+    skip = google_cursor.get("skip", 0)
+    async with aclosing(
+        client.iter_pages(
+            access_token,
+            page_size=page_size,
+            page_token=google_cursor.get("page"),
+            timeMin=time_min,
+            timeMax=time_max,
+            singleEvents=True,
+            orderBy="startTime",
+        )
+    ) as pages:
+        async for page_token, events in pages:
+            for index, event in enumerate(events):
+                if index < skip:
+                    continue
+                yield event, {
+                    "source": "google",
+                    "page": page_token,
+                    "skip": index,
+                    "size": page_size,
+                }
+            skip = 0
+
+
+@timed(TOOL_SECONDS, tool="list_calendar_events")
+async def list_calendar_events(
     access_token: str,
     time_min: Optional[str] = None,
     time_max: Optional[str] = None,
-    max_results: int = 10,
+    max_results: int = 50,
+    page_token: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None,
 ) -> Dict[str, Any]:
     """
     查詢行事曆事件
@@ -25,50 +180,62 @@ def list_calendar_events(
         time_min: 開始時間 (ISO 8601 格式)
         time_max: 結束時間 (ISO 8601 格式)
         max_results: 最大回傳數量
+        page_token: 上一次查詢回傳的 next_page_token，用於取得後續事件
 
     Returns:
-        事件列表
+        事件列表；還有更多事件時附上 next_page_token
     """
     try:
-        service = get_calendar_service(access_token)
-
         if not time_min:
             time_min = datetime.utcnow().isoformat() + "Z"
 
-        events_result = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=time_min,
-                timeMax=time_max,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy="startTime",
-            )
-            .execute()
-        )
+        try:
+            cursor = _decode_cursor(page_token)
+        except ValueError:
+            return {"success": False, "error": "page_token 無效，請重新查詢"}
 
-        events = events_result.get("items", [])
+        max_results = max(1, max_results)
+        events: List[Dict[str, Any]] = []
+        used_tokens = 0
+        next_cursor = None
 
-        return {
-            "success": True,
-            "events": [
-                {
+        # 逐筆取得事件，達到數量或 token 上限即停止（不再取後續頁面）
+        async with aclosing(
+            _iter_events(
+                access_token, time_min, time_max, max_results + 1, cursor, tool_context
+            )
+        ) as stream:
+            async for event, event_cursor in stream:
+                item = {
                     "id": event["id"],
+                    "etag": event.get("etag"),
                     "summary": event.get("summary", "無標題"),
                     "start": event["start"].get("dateTime", event["start"].get("date")),
                     "end": event["end"].get("dateTime", event["end"].get("date")),
                     "description": event.get("description", ""),
                     "location": event.get("location", ""),
                 }
-                for event in events
-            ],
-        }
-    except HttpError as error:
-        return {"success": False, "error": str(error)}
+                tokens = len(orjson.dumps(item)) // 4
+                if len(events) >= max_results or (
+                    events and used_tokens + tokens > settings.calendar_list_token_budget
+                ):
+                    next_cursor = event_cursor
+                    break
+                events.append(item)
+                used_tokens += tokens
 
+        result: Dict[str, Any] = {"success": True, "events": events}
+        if next_cursor is not None:
+            result["next_page_token"] = _encode_cursor(next_cursor)
+        return result
+    except CalendarApiError as error:
+        return _api_failure(error, tool_context)
+    except ValueError:
+        return {"success": False, "error": "time_min / time_max 必須是 ISO 8601 格式"}
 
-def create_calendar_event(
+
+@timed(TOOL_SECONDS, tool="create_calendar_event")
+async def create_calendar_event(
     access_token: str,
     summary: str,
     start: str,
@@ -76,6 +243,7 @@ def create_calendar_event(
     description: Optional[str] = None,
     location: Optional[str] = None,
     timezone: str = "Asia/Taipei",
+    tool_context: Optional[ToolContext] = None,
 ) -> Dict[str, Any]:
     """
     新增行事曆事件
@@ -93,22 +261,11 @@ def create_calendar_event(
         新增的事件資訊
     """
     try:
-        service = get_calendar_service(access_token)
-
-        event = {
-            "summary": summary,
-            "start": {"dateTime": start, "timeZone": timezone},
-            "end": {"dateTime": end, "timeZone": timezone},
-        }
-
-        if description:
-            event["description"] = description
-        if location:
-            event["location"] = location
+        client = get_calendar_client()
 
-        created_event = (
-            service.events().insert(calendarId="primary", body=event).execute()
-        )
+        event = _event_body(summary, start, end, description, location, timezone)
+        created_event = await client.insert_event(access_token, event)
+        _mirror_upsert(tool_context, created_event)
 
         return {
             "success": True,
@@ -120,11 +277,12 @@ def create_calendar_event(
                 "htmlLink": created_event.get("htmlLink"),
             },
         }
-    except HttpError as error:
-        return {"success": False, "error": str(error)}
+    except CalendarApiError as error:
+        return _api_failure(error, tool_context)
 
 
-def update_calendar_event(
+@timed(TOOL_SECONDS, tool="update_calendar_event")
+async def update_calendar_event(
     access_token: str,
     event_id: str,
     summary: Optional[str] = None,
@@ -133,6 +291,8 @@ def update_calendar_event(
     description: Optional[str] = None,
     location: Optional[str] = None,
     timezone: str = "Asia/Taipei",
+    etag: Optional[str] = None,
+    tool_context: Optional[ToolContext] = None,
 ) -> Dict[str, Any]:
     """
     修改行事曆事件
@@ -146,50 +306,49 @@ def update_calendar_event(
         description: 事件描述
         location: 地點
         timezone: 時區
+        etag: 查詢時取得的事件 etag；事件在那之後被修改時不會覆寫，並回傳 conflict
 
     Returns:
         更新後的事件資訊
     """
     try:
-        service = get_calendar_service(access_token)
+        client = get_calendar_client()
 
-        # 先取得現有事件
-        existing_event = (
-            service.events().get(calendarId="primary", eventId=event_id).execute()
+        # 只送出要修改的欄位（PATCH），不必先取得整個事件
+        changes = _event_body(
+            summary, start, end, description, location, timezone, patch=True
         )
+        if not changes:
+            return {"success": False, "error": "沒有要修改的欄位"}
 
-        # 更新欄位
-        if summary is not None:
-            existing_event["summary"] = summary
-        if start is not None:
-            existing_event["start"] = {"dateTime": start, "timeZone": timezone}
-        if end is not None:
-            existing_event["end"] = {"dateTime": end, "timeZone": timezone}
-        if description is not None:
-            existing_event["description"] = description
-        if location is not None:
-            existing_event["location"] = location
-
-        updated_event = (
-            service.events()
-            .update(calendarId="primary", eventId=event_id, body=existing_event)
-            .execute()
+        updated_event = await client.patch_event(
+            access_token,
+            event_id,
+            changes,
+            if_match=etag or _known_etag(tool_context, event_id),
         )
+        _mirror_upsert(tool_context, updated_event)
 
         return {
             "success": True,
             "event": {
                 "id": updated_event["id"],
+                "etag": updated_event.get("etag"),
                 "summary": updated_event.get("summary"),
                 "start": updated_event["start"].get("dateTime"),
                 "end": updated_event["end"].get("dateTime"),
             },
         }
-    except HttpError as error:
-        return {"success": False, "error": str(error)}
+    except CalendarApiError as error:
+        if error.status_code == 412:
+            return _conflict(tool_context)
+        return _api_failure(error, tool_context)
 
 
-def delete_calendar_event(access_token: str, event_id: str) -> Dict[str, Any]:
+@timed(TOOL_SECONDS, tool="delete_calendar_event")
+async def delete_calendar_event(
+    access_token: str, event_id: str, tool_context: Optional[ToolContext] = None
+) -> Dict[str, Any]:
     """
     刪除行事曆事件
 
@@ -201,9 +360,132 @@ def delete_calendar_event(access_token: str, event_id: str) -> Dict[str, Any]:
         刪除結果
     """
     try:
-        service = get_calendar_service(access_token)
-        service.events().delete(calendarId="primary", eventId=event_id).execute()
+        client = get_calendar_client()
+        await client.delete_event(access_token, event_id)
+
+        mirror = get_calendar_mirror()
+        if mirror is not None and tool_context is not None:
+            mirror.remove(tool_context.user_id, event_id)
 
         return {"success": True, "message": f"事件 {event_id} 已成功刪除"}
-    except HttpError as error:
-        return {"success": False, "error": str(error)}
+    except CalendarApiError as error:
+        return _api_failure(error, tool_context)
+
+
+class CalendarOperation(BaseModel):
+    """batch_calendar_operations 的單筆操作（欄位會出現在給 model 的 function declaration 中）"""
+
+    action: str  # "create"、"update" 或 "delete"
+    event_id: Optional[str] = None
+    summary: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    timezone: Optional[str] = None
+    etag: Optional[str] = None
+
+
+@timed(TOOL_SECONDS, tool="batch_calendar_operations")
+async def batch_calendar_operations(
+    access_token: str,
+    operations: List[CalendarOperation],
+    tool_context: Optional[ToolContext] = None,
+) -> Dict[str, Any]:
+    """
+    一次執行多筆新增 / 修改 / 刪除（例如「把週五的會議都移到週一」）
+
+    Args:
+        access_token: Google OAuth access token
+        operations: 操作列表，每筆包含 action（"create"、"update" 或 "delete"）；
+            update 與 delete 需要 event_id；create 需要 summary、start、end；
+            create 與 update 可另帶 description、location、timezone（預設 Asia/Taipei），
+            update 只修改有提供的欄位，並可帶查詢時取得的 etag
+
+    Returns:
+        每筆操作的結果，順序與 operations 相同
+    """
+    client = get_calendar_client()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+    requests = []
+    pending = []
+
+    for index, operation in enumerate(operations):
+        # ADK 未轉換成 model 時參數仍是 dict
+        if isinstance(operation, dict):
+            try:
+                operation = CalendarOperation.model_validate(operation)
+            except ValidationError:
+                results[index] = {"success": False, "error": "操作格式不正確"}
+                continue
+        action = operation.action
+        event_id = operation.event_id
+        body = _event_body(
+            operation.summary,
+            operation.start,
+            operation.end,
+            operation.description,
+            operation.location,
+            operation.timezone or "Asia/Taipei",
+            patch=action == "update",
+        )
+
+        if action == "create" and all(k in body for k in ("summary", "start", "end")):
+            requests.append(
+                ("POST", client.with_fields(client.events_path("primary")), body, None)
+            )
+        elif action == "update" and event_id and body:
+            requests.append(
+                (
+                    "PATCH",
+                    client.with_fields(client.events_path("primary", event_id)),
+                    body,
+                    operation.etag or _known_etag(tool_context, event_id),
+                )
+            )
+        elif action == "delete" and event_id:
+            requests.append(("DELETE", client.events_path("primary", event_id), None, None))
+        else:
+            results[index] = {
+                "success": False,
+                "action": action,
+                "error": "操作缺少必要欄位或 action 不正確",
+            }
+            continue
+        pending.append((index, action, event_id))
+
+    # 個別 HTTP 請求失敗時只影響該 chunk 的操作，其餘結果照常回報
+    responses = await client.batch(access_token, requests) if requests else []
+
+    if any(isinstance(r, CalendarApiError) and r.status_code == 401 for r in responses):
+        return need_auth_result(tool_context.user_id if tool_context is not None else None)
+
+    for (index, action, event_id), response in zip(pending, responses):
+        if isinstance(response, CalendarApiError):
+            if response.status_code == 412:
+                results[index] = {"action": action, "event_id": event_id, **_conflict(tool_context)}
+            else:
+                results[index] = {"success": False, "action": action, "error": str(response)}
+        elif action == "delete":
+            mirror = get_calendar_mirror()
+            if mirror is not None and tool_context is not None:
+                mirror.remove(tool_context.user_id, event_id)
+            results[index] = {"success": True, "action": action, "event_id": event_id}
+        else:
+            _mirror_upsert(tool_context, response)
+            results[index] = {
+                "success": True,
+                "action": action,
+                "event": {
+                    "id": response["id"],
+                    "etag": response.get("etag"),
+                    "summary": response.get("summary"),
+                    "start": response["start"].get("dateTime"),
+                    "end": response["end"].get("dateTime"),
+                },
+            }
+
+    return {
+        "success": all(result["success"] for result in results),
+        "results": results,
+    }
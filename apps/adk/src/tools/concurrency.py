@@ -0,0 +1,55 @@
+"""tool 包裝：讓同一個 LLM 回應中的多個 function call 可並行執行，並限制每位使用者的並行數"""
+import asyncio
+import functools
+import inspect
+import weakref
+from typing import Any, Callable
+
+from google.adk.tools.tool_context import ToolContext
+
+from ..config import settings
+
+# user_id -> Semaphore；沒有進行中的呼叫時自動回收
+_user_semaphores: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _user_semaphore(user_id: str) -> asyncio.Semaphore:
+    semaphore = _user_semaphores.get(user_id)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.calendar_tool_concurrency_per_user)
+        _user_semaphores[user_id] = semaphore
+    return semaphore
+
+
+def user_limited_tool(func: Callable[..., Any]) -> Callable[..., Any]:
+    """限制每位使用者同時執行的 async tool 數量
+
+    ADK 會並行執行同一個回應中的 async function call，並依呼叫順序合併結果。
+    包裝後的函式多了 tool_context 參數（ADK 自動注入，不會出現在給 model 的 function declaration 中），其餘簽名與 docstring 不變；
+    原函式本身宣告 tool_context 時則一併傳入。
+    """
+    if not inspect.iscoroutinefunction(func):
+        raise TypeError(f"{func.__name__} must be an async function")
+    signature = inspect.signature(func)
+    passes_context = "tool_context" in signature.parameters
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, tool_context: ToolContext, **kwargs: Any) -> Any:
+        if passes_context:
+            kwargs["tool_context"] = tool_context
+        async with _user_semaphore(tool_context.user_id):
+            return await func(*args, **kwargs)
+
+    if passes_context:
+        return wrapper
+    wrapper.__signature__ = signature.replace(
+        parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(
+                "tool_context", inspect.Parameter.KEYWORD_ONLY, annotation=ToolContext
+            ),
+        ]
+    )
+    return wrapper
@@ -0,0 +1,24 @@
+from google.adk.events import Event
+from google.genai import types
+
+from src.services.db_session_service import dump_event, load_event
+
+
+def test_event_round_trip_keeps_inline_bytes():
+    payload = bytes(range(256))
+    event = Event(
+        author="user",
+        invocation_id="inv",
+        content=types.Content(
+            role="user",
+            parts=[
+                types.Part(text="附件"),
+                types.Part.from_bytes(data=payload, mime_type="application/octet-stream"),
+            ],
+        ),
+    )
+
+    restored = load_event(dump_event(event))
+
+    assert restored.content.parts[1].inline_data.data == payload
+    assert restored.content.parts[1].inline_data.mime_type == "application/octet-stream"